@@ -9,25 +9,78 @@
 """
 
 # import python internal libraries
-from datetime import datetime
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from csv import Error as CsvError, Sniffer
+from datetime import datetime, timedelta
+from functools import partial
+from json import dump, dumps, load, loads
 from math import isnan
 from ntpath import split
+from hashlib import sha1
+from os import listdir, makedirs, stat, utime
+from os.path import exists, getmtime, getsize, join
+from posixpath import join as posix_join, normpath
+from re import sub
+from shutil import rmtree
+from tempfile import gettempdir
+from time import perf_counter, process_time
+from tracemalloc import get_traced_memory, is_tracing, \
+    start as start_tracing, stop as stop_tracing
+try:
+    from tracemalloc import reset_peak
+except ImportError:  # Python 3.8 or earlier
+    reset_peak = None
+from xml.etree.ElementTree import iterparse
+from zipfile import ZipFile
 from dateutil.parser import parse
 
 # import third party libraries
 # from numpy import where
-from pandas import DataFrame, Series, ExcelFile, read_csv, read_excel
+from numpy import asarray, load as load_npy, save as save_npy
+from pandas import DataFrame, DatetimeIndex, MultiIndex, Series, \
+    ExcelFile, concat, read_csv, read_excel, read_feather, read_parquet, \
+    to_datetime, to_numeric
+from pandas.api.types import infer_dtype, is_numeric_dtype, is_string_dtype
 from pandas.tslib import Timestamp
 
 # import user-defined libraries
 
 
+# define global variables
+SNIFF_SIZE = 16384  # number of characters inspected to sniff a csv file
+# candidate formats of the dates and the clock times for the automatic
+# detection of time formats, in the order of preference
+DATE_FORMATS = [
+    '%Y-%m-%d', '%Y/%m/%d', '%m/%d/%Y', '%d/%m/%Y', '%m/%d/%y', '%d/%m/%y',
+    '%d.%m.%Y', '%d.%m.%y', '%m-%d-%Y', '%d-%m-%Y', '%Y%m%d', '%d-%b-%Y',
+    '%d-%b-%y', '%d %b %Y', '%b %d %Y', '%d %B %Y', '%B %d %Y'
+]
+CLOCK_FORMATS = [
+    '', ' %H:%M:%S', ' %H:%M', ' %H:%M:%S.%f', ' %I:%M:%S %p', ' %I:%M %p',
+    ' %I:%M:%S%p', ' %I:%M%p', 'T%H:%M:%S', 'T%H:%M', 'T%H:%M:%S.%f'
+]
+INFER_SIZE = 20  # number of time strings to infer the time format
+VALIDATE_SIZE = 1000  # number of time strings to validate the time format
+HASH_BLOCK_SIZE = 1048576  # number of bytes read at a time to hash a file
+PARSE_CACHE_SIZE = 1073741824  # default maximum size of a cache directory
+# cache directory of the parsed data for the graphical user interfaces
+PARSE_CACHE_DIR = join(gettempdir(), 'auto_data_preprocessor_cache')
+XLSX_BLOCK_SIZE = 10000  # number of rows in a block of a streamed xlsx sheet
+# built-in number formats of dates and times in xlsx files
+XLSX_DATE_FORMAT_IDS = set(list(range(14, 23))+list(range(45, 48)))
+
+
 # write functions
 def read_data(filename: str, header: int=None,
               time_format: str='%m/%d/%y %I:%M:%S %p CST',
               sheetnames: list=None,
               interpolation: bool=False, duration: bool=False,
-              dateautodetect: bool=False) -> dict:
+              dateautodetect: bool=False, chunksize: int=None,
+              sep: str=None, workers: int=None,
+              streaming: bool=False, mmap_cache: bool=False,
+              cache_dir: str=None, cache_size: int=PARSE_CACHE_SIZE,
+              callback=None, instrument: bool=False) -> dict:
     """
         This function reads the data in filename that is in specified format
         and returns a pandas dataframe with time data as the index and
@@ -41,12 +94,16 @@ def read_data(filename: str, header: int=None,
         Inputs:
         ==========
         filename: string
-            path to the data file
+            path to the data file. It can be a csv, xls, xlsx, parquet,
+            feather or arrow file
 
         header: int, list of ints, default None
             Row (0-indexed) to use for the column labels of the parsed
             DataFrame. If a list of integers is passed those row positions
-            will be combined into a MultiIndex. Default None
+            will be combined into a MultiIndex. If 'infer' is passed, the
+            first row of a csv file is used as the column labels if it looks
+            like a header, and the first row of an Excel sheet is always
+            used. Default None
 
         time_format: string
             format of string in time. Default '%m/%d/%y %I:%M:%S %p CST'
@@ -70,72 +127,198 @@ def read_data(filename: str, header: int=None,
         dateautodetect: bool
             detect the format of the date time in the first column
             automatically. Default False
-    """
 
-    # initialize the dataframe
-    ext = filename.split('.')[-1]
+        chunksize: int
+            number of rows to be read at a time from a csv file. If it is
+            given, the dict values are iterators that yield pandas DataFrame
+            with at most chunksize rows each instead of pandas DataFrame,
+            so that the memory use does not depend on the file size.
+            Default None which means that the whole file is read at once
+
+        sep: str
+            separator of a csv file. Default None which means that it is
+            detected from the first few KB of the file together with the
+            quoting of the file
 
-    # preprocess pddf time string
-    def _time_config(pddf):
-        """
-            Preprocess the time string in a pandas DataFrame and returns
-            a pandas DataFrame
-        """
+        workers: int
+            number of worker processes to read the worksheets of an Excel
+            file in parallel. The names of the worksheets are listed
+            without parsing the workbook, and each worker process only
+            loads the worksheet it reads, so that an xls file is not parsed
+            as a whole once per worksheet. Default None which means that
+            the worksheets are read one by one
 
-        # rename the first column name
-        pddf.columns = ['Time']+pddf.columns.tolist()[1:]
+        streaming: bool
+            read the rows of the worksheets of an xlsx file one by one from
+            the xml files in it instead of loading the whole workbook, so
+            that only the rows of the requested worksheets are kept in
+            memory. header can only be None or an int. workers is not used.
+            Default False
 
-        # make time column as the index
+        mmap_cache: bool
+            keep the parsed time stamps and values in a cache directory
+            next to filename, named after filename with '.cache' at the end,
+            and map the cache into memory instead of parsing filename again
+            if filename and the inputs are not changed. The values are
+            float64 in the cache. Worksheets with values that are not
+            numbers are not cached. Not used with chunksize. Default False
+
+        cache_dir: str
+            directory of a cache of the parsed data shared by all files. The
+            data are found by the hash of the content of filename and the
+            inputs, so that a file is not parsed again even if it is moved
+            or copied. The data are kept like mmap_cache. Not used with
+            chunksize. Default None: no cache
+
+        cache_size: int
+            maximum size of cache_dir in bytes. The least recently used data
+            are removed first when the cache is too large. Default
+            PARSE_CACHE_SIZE
+
+        callback: function
+            function called with a dict of the progress. It is called with
+            {'event': 'phase_start', 'phase': 'read'} at the beginning, with
+            {'event': 'rows', 'sheet': name of the worksheet, 'rows': number
+            of rows parsed} when rows of a worksheet are parsed and with
+            {'event': 'phase_end', 'phase': 'read'} at the end. All dicts
+            have 'elapsed', the seconds since the beginning of the call.
+            Exceptions raised by it stop the reading so that it can be
+            cancelled between the worksheets. The rows in the iterators of
+            chunksize are not reported. Default None
+
+        instrument: bool
+            record the wall time, the CPU time and the peak memory of the
+            reading and of each worksheet and write them to a JSON report
+            at the path of filename with '.report.json' at the end. See
+            start_instrumentation() for the report. Default False
+    """
+
+    # measure the reading through the events of the callback
+    if instrument:
+        state = start_instrumentation('read_data')
         try:
-            if dateautodetect:
-                pddf.loc[:, 'Time'] = [
-                    parse(timestr) for timestr in pddf.loc[:, 'Time']
-                ]
-            else:
-                pddf.loc[:, 'Time'] = [
-                    datetime.strptime(timestr, time_format)
-                    for timestr in pddf.loc[:, 'Time']
-                ]
-        except TypeError:  # the time string has been converted by pandas
-            pass
-        pddf.set_index('Time', inplace=True)
+            pddfs = read_data(
+                filename, header=header, time_format=time_format,
+                sheetnames=sheetnames, interpolation=interpolation,
+                duration=duration, dateautodetect=dateautodetect,
+                chunksize=chunksize, sep=sep, workers=workers,
+                streaming=streaming, mmap_cache=mmap_cache,
+                cache_dir=cache_dir, cache_size=cache_size,
+                callback=partial(record_instrumentation, state, callback)
+            )
+        finally:
+            stop_instrumentation(state)
+        write_instrumentation(state, ''.join([filename, '.report.json']))
+        return pddfs
 
-        # force convert all values to float64
-        pddf = pddf.convert_objects(convert_numeric=True)
+    # add the elapsed time to the events
+    if callback is not None:
+        callback = timed_callback(callback)
+    report_phase(callback, 'read', 'start')
 
-        return pddf
+    # map the parsed data from the cache of the content of the file
+    if cache_dir is not None and chunksize is None:
+        content_key = _content_cache_key(
+            filename, header, time_format, sheetnames, dateautodetect, sep
+        )
+        pddfs = _load_mmap_cache(
+            join(cache_dir, content_key['hash']), content_key
+        )
+        if pddfs is not None:
+            # mark the entry as the most recently used one
+            utime(join(cache_dir, content_key['hash'], 'cache.json'))
+            for sheet_name in pddfs:
+                _report_rows(callback, sheet_name, pddfs[sheet_name].shape[0])
+            report_phase(callback, 'read', 'end')
+            return pddfs
+
+    # map the parsed data from the cache if they are up to date
+    if mmap_cache and chunksize is None:
+        cache_key = _mmap_cache_key(
+            filename, header, time_format, sheetnames, dateautodetect, sep
+        )
+        pddfs = _load_mmap_cache(''.join([filename, '.cache']), cache_key)
+        if pddfs is not None:
+            for sheet_name in pddfs:
+                _report_rows(callback, sheet_name, pddfs[sheet_name].shape[0])
+            report_phase(callback, 'read', 'end')
+            return pddfs
+
+    # initialize the dataframe
+    ext = filename.split('.')[-1]
 
     # read the file. Read the file as two columns first to conduct
     # preprocessing before
     pddfs = {}
-    if ext == 'xlsx' or ext == 'xls':
-        with ExcelFile(filename) as xlsx:
-            if sheetnames is None:
-                for sheet_name in xlsx.sheet_names:
-                    pddfs[sheet_name] = _time_config(read_excel(
-                        xlsx, sheet_name, header=header
-                    ))
-                    break  # read first sheet
-            elif sheetnames == []:  # empty list implies all sheets
-                for sheet_name in xlsx.sheet_names:
-                    pddfs[sheet_name] = _time_config(read_excel(
-                        xlsx, sheet_name, header=header
-                    ))
-            else:
-                for sheet_name in sheetnames:
+    if chunksize is not None and ext != 'csv':
+        raise ValueError(''.join([
+            'Only csv files can be read in chunks by ',
+            'data_read.read_data(). Exiting.......'
+        ]))
+    if streaming and ext != 'xlsx':
+        raise ValueError(''.join([
+            'Only xlsx files can be streamed by ',
+            'data_read.read_data(). Exiting.......'
+        ]))
+    if streaming:
+        if header == 'infer':
+            header = 0
+        pddfs = _read_xlsx_stream(
+            filename, sheetnames, header, time_format, dateautodetect,
+            callback
+        )
+    elif ext == 'xlsx' or ext == 'xls':
+        if header == 'infer':
+            header = 0
+        if workers is not None and workers > 1:
+            # list the worksheets without parsing the workbook
+            sheets = _select_sheets(_excel_sheet_names(filename), sheetnames)
+        if workers is None or workers <= 1 or len(sheets) <= 1:
+            with ExcelFile(filename) as xlsx:
+                sheets = _select_sheets(xlsx.sheet_names, sheetnames)
+                for sheet_name in sheets:
                     pddfs[sheet_name] = _time_config(read_excel(
                         xlsx, sheet_name, header=header
-                    ))  # read the specified sheets
+                    ), time_format, dateautodetect)
+                    _report_rows(
+                        callback, sheet_name, pddfs[sheet_name].shape[0]
+                    )
+        else:
+            # each worker process opens the file and parses its own sheets
+            jobs = [
+                (filename, sheet_name, header, time_format, dateautodetect)
+                for sheet_name in sheets
+            ]
+            with ProcessPoolExecutor(
+                    max_workers=min(workers, len(jobs))
+                    ) as executor:
+                # map returns the dataframes in the order of the sheets
+                for sheet_name, pddf in zip(
+                        sheets, executor.map(_read_excel_sheet, jobs)
+                        ):
+                    pddfs[sheet_name] = pddf
+                    _report_rows(callback, sheet_name, pddf.shape[0])
     elif ext == 'csv':
-        pddf = read_csv(filename, header=header)
-        if pddf.shape[1] == 1:
-            # one column only including the index. The separator is wrong.
-            pddf = read_csv(filename, header=header, sep=';')
-        if pddf.shape[1] == 1:
-            # one column only including the index. The separator is wrong.
-            pddf = read_csv(filename, header=header, sep='\t')
+        # inspect the beginning of the file to parse it only once
+        csv_kwargs = _sniff_csv(filename, header, sep)
+        # use the name of the file as the worksheet name
+        if chunksize is None:
+            sheet_name = split(filename)[-1].split('.')[0]
+            pddfs[sheet_name] = _time_config(
+                read_csv(filename, **csv_kwargs), time_format, dateautodetect
+            )
+            _report_rows(callback, sheet_name, pddfs[sheet_name].shape[0])
+        else:
+            pddfs[split(filename)[-1].split('.')[0]] = _read_csv_chunks(
+                filename, csv_kwargs, chunksize, time_format, dateautodetect
+            )
+    elif ext in ['parquet', 'feather', 'arrow']:
         # use the name of the file as the worksheet name
-        pddfs[split(filename)[-1].split('.')[0]] = _time_config(pddf)
+        sheet_name = split(filename)[-1].split('.')[0]
+        pddfs[sheet_name] = _read_columnar(
+            filename, time_format, dateautodetect
+        )
+        _report_rows(callback, sheet_name, pddfs[sheet_name].shape[0])
     else:
         raise ValueError(''.join([
             'The file extension of the data file cannot be recognized by ',
@@ -155,9 +338,1240 @@ def read_data(filename: str, header: int=None,
             # for ind, timeind in enumerate(pddf[pddf.columns[0]].index)
         # ]
 
+    # keep the parsed data for the next time
+    if mmap_cache and chunksize is None and _save_mmap_cache(
+            ''.join([filename, '.cache']), cache_key, pddfs
+            ):
+        pddfs = _load_mmap_cache(''.join([filename, '.cache']), cache_key)
+    if cache_dir is not None and chunksize is None and _save_mmap_cache(
+            join(cache_dir, content_key['hash']), content_key, pddfs
+            ):
+        _evict_parse_cache(cache_dir, cache_size, content_key['hash'])
+
+    report_phase(callback, 'read', 'end')
+    return pddfs
+
+
+def timed_callback(callback):
+    """
+        Return a function that adds 'elapsed', the seconds since this
+        function is called, to the dict of an event and passes it to
+        callback
+
+        Inputs:
+        ==========
+        callback: function
+            function that receives the dicts of the events
+    """
+
+    return partial(_add_elapsed_time, callback, perf_counter())
+
+
+def _add_elapsed_time(callback, start: float, event: dict):
+    """
+        Add the seconds since start to the dict of an event and pass it to
+        callback
+
+        Inputs:
+        ==========
+        callback: function
+            function that receives the dicts of the events
+
+        start: float
+            time.perf_counter() at the beginning
+
+        event: dict
+            dict of the event
+    """
+
+    event['elapsed'] = perf_counter()-start
+    callback(event)
+
+
+def report_phase(callback, phase: str, stage: str):
+    """
+        Tell callback that a phase of the processing starts or ends if it
+        is given
+
+        Inputs:
+        ==========
+        callback: function
+            function that receives the dicts of the events. None for nothing
+
+        phase: str
+            name of the phase, e.g. 'read', 'resample' or 'write'
+
+        stage: str
+            'start' or 'end'
+    """
+
+    if callback is not None:
+        callback({'event': ''.join(['phase_', stage]), 'phase': phase})
+
+
+def start_instrumentation(name: str) -> dict:
+    """
+        Start to measure a function through the events of its callback and
+        return the state of the measurement for record_instrumentation().
+        The report in the state is a dict like {'function': name,
+        'wall_time': seconds, 'cpu_time': seconds, 'peak_memory': bytes,
+        'phases': {name of the phase: {'wall_time': ..., 'cpu_time': ...,
+        'peak_memory': ..., 'sheets': {name of the worksheet: {'wall_time':
+        ..., 'cpu_time': ..., 'peak_memory': ...}}}}}. The time between two
+        events is counted for the phase and the worksheet of the later
+        event. The CPU time is the time of this process only, and the peak
+        memory is the largest memory allocated since the start as traced
+        by tracemalloc, which slows down the processing. Python 3.8 or
+        earlier reports the peak memory since the start for every phase
+        and worksheet
+
+        Inputs:
+        ==========
+        name: str
+            name of the function measured
+    """
+
+    started = not is_tracing()
+    if started:
+        start_tracing()
+    elif reset_peak is not None:
+        reset_peak()
+    return {
+        'report': OrderedDict([
+            ('function', name), ('wall_time', 0.0), ('cpu_time', 0.0),
+            ('peak_memory', 0), ('phases', OrderedDict())
+        ]),
+        'wall': perf_counter(), 'cpu': process_time(),
+        'memory': get_traced_memory()[0], 'phase': None,
+        'started': started, 'stopped': False
+    }
+
+
+def record_instrumentation(state: dict, callback, event: dict):
+    """
+        Count the wall time, the CPU time and the peak memory since the last
+        event for the phase and the worksheet of an event and pass the event
+        to callback
+
+        Inputs:
+        ==========
+        state: dict
+            state of the measurement from start_instrumentation()
+
+        callback: function
+            function that receives the dicts of the events. None for nothing
+
+        event: dict
+            dict of the event
+    """
+
+    interval = _measure_interval(state)
+    if event['event'] == 'phase_start':
+        state['phase'] = event['phase']
+    elif state['phase'] is not None:
+        phases = state['report']['phases']
+        if state['phase'] not in phases:
+            phases[state['phase']] = _new_measurement()
+            phases[state['phase']]['sheets'] = OrderedDict()
+        _add_interval(phases[state['phase']], interval)
+        if 'sheet' in event:
+            sheets = phases[state['phase']]['sheets']
+            if str(event['sheet']) not in sheets:
+                sheets[str(event['sheet'])] = _new_measurement()
+            _add_interval(sheets[str(event['sheet'])], interval)
+        if event['event'] == 'phase_end':
+            state['phase'] = None
+    if callback is not None:
+        callback(event)
+
+
+def stop_instrumentation(state: dict):
+    """
+        Count the time since the last event and stop tracing the memory if
+        start_instrumentation() started it
+
+        Inputs:
+        ==========
+        state: dict
+            state of the measurement from start_instrumentation()
+    """
+
+    if not state['stopped']:
+        _measure_interval(state)
+        state['stopped'] = True
+        if state['started']:
+            stop_tracing()
+
+
+def write_instrumentation(state: dict, report_file: str):
+    """
+        Write the report of a measurement to a JSON file
+
+        Inputs:
+        ==========
+        state: dict
+            state of the measurement from start_instrumentation()
+
+        report_file: str
+            path to the JSON file
+    """
+
+    with open(report_file, 'w') as jsonfile:
+        dump(state['report'], jsonfile, indent=4)
+
+
+def _measure_interval(state: dict) -> dict:
+    """
+        Return the wall time, the CPU time and the peak memory since the
+        last measurement in a dict and add them to the whole report
+
+        Inputs:
+        ==========
+        state: dict
+            state of the measurement from start_instrumentation()
+    """
+
+    wall = perf_counter()
+    cpu = process_time()
+    interval = {
+        'wall_time': wall-state['wall'], 'cpu_time': cpu-state['cpu'],
+        'peak_memory': max(0, get_traced_memory()[1]-state['memory'])
+    }
+    if reset_peak is not None:
+        reset_peak()
+    state['wall'] = wall
+    state['cpu'] = cpu
+    _add_interval(state['report'], interval)
+    return interval
+
+
+def _new_measurement() -> OrderedDict:
+    """
+        Return an empty measurement of a phase or a worksheet
+    """
+
+    return OrderedDict([
+        ('wall_time', 0.0), ('cpu_time', 0.0), ('peak_memory', 0)
+    ])
+
+
+def _add_interval(measurement: dict, interval: dict):
+    """
+        Add the time of an interval to a measurement and keep the larger
+        peak memory
+
+        Inputs:
+        ==========
+        measurement: dict
+            measurement of a phase or a worksheet
+
+        interval: dict
+            measurement of an interval from _measure_interval()
+    """
+
+    measurement['wall_time'] += interval['wall_time']
+    measurement['cpu_time'] += interval['cpu_time']
+    measurement['peak_memory'] = max(
+        measurement['peak_memory'], interval['peak_memory']
+    )
+
+
+def _report_rows(callback, sheet_name: str, rows: int):
+    """
+        Tell callback that rows of a worksheet are parsed if it is given
+
+        Inputs:
+        ==========
+        callback: function
+            function to be called as in read_data(). None for nothing
+
+        sheet_name: str
+            name of the worksheet
+
+        rows: int
+            number of rows of the worksheet parsed so far
+    """
+
+    if callback is not None:
+        callback({'event': 'rows', 'sheet': sheet_name, 'rows': rows})
+
+
+def _select_sheets(names: list, sheetnames: list) -> list:
+    """
+        Return the names of the worksheets to be read
+
+        Inputs:
+        ==========
+        names: list
+            names of all worksheets in the file in order
+
+        sheetnames: list
+            sheetnames as in read_data()
+    """
+
+    if sheetnames is None:
+        return names[0:1]  # read first sheet
+    elif sheetnames == []:  # empty list implies all sheets
+        return names
+    return sheetnames  # read the specified sheets
+
+
+def _excel_sheet_names(filename: str) -> list:
+    """
+        Return the names of the worksheets in an xls or xlsx file in order
+        without parsing the worksheets
+
+        Inputs:
+        ==========
+        filename: string
+            path to the Excel file
+    """
+
+    if filename.split('.')[-1] == 'xlsx':
+        with ZipFile(filename) as xlsx:
+            return _xlsx_workbook(xlsx)[0]
+    # xlrd only loads the list of the worksheets on demand. Import it here
+    # as it is only needed for xls files
+    from xlrd import open_workbook
+    book = open_workbook(filename, on_demand=True)
+    try:
+        return book.sheet_names()
+    finally:
+        book.release_resources()
+
+
+def _read_excel_sheet(job: tuple) -> DataFrame:
+    """
+        Read a worksheet of an Excel file and preprocess its time strings
+        in a worker process. Only the worksheet is loaded from an xls
+        file. Returns a pandas DataFrame
+
+        Inputs:
+        ==========
+        job: tuple
+            path to the Excel file, name of the worksheet, header,
+            time_format and dateautodetect as in read_data()
+    """
+
+    filename, sheet_name, header, time_format, dateautodetect = job
+    if filename.split('.')[-1] == 'xlsx':
+        # openpyxl reads the workbook lazily in read-only mode
+        return _time_config(
+            read_excel(filename, sheet_name, header=header), time_format,
+            dateautodetect
+        )
+    # load only the worksheet from an xls file. Import xlrd here as it is
+    # only needed for xls files
+    from xlrd import open_workbook
+    book = open_workbook(filename, on_demand=True)
+    try:
+        pddf = read_excel(book, sheet_name, header=header, engine='xlrd')
+    finally:
+        book.release_resources()
+    return _time_config(pddf, time_format, dateautodetect)
+
+
+def _read_xlsx_stream(filename: str, sheetnames: list, header: int,
+                      time_format: str, dateautodetect: bool,
+                      callback=None) -> dict:
+    """
+        Read the worksheets of an xlsx file row by row from the xml files in
+        it and build the dataframes in blocks of XLSX_BLOCK_SIZE rows.
+        Returns a dict of pandas DataFrame like read_data()
+
+        Inputs:
+        ==========
+        filename: string
+            path to the xlsx file
+
+        sheetnames: list
+            list of string for the name of worksheets to be imported. None
+            for the first sheet and [] for all sheets
+
+        header: int or None
+            Row (0-indexed) to use for the column labels
+
+        time_format: string
+            format of string in time
+
+        dateautodetect: bool
+            detect the format of the date time in the first column
+            automatically
+
+        callback: function
+            function called after each block of rows like in read_data().
+            Default None
+    """
+
+    if header is not None and not isinstance(header, int):
+        raise ValueError(''.join([
+            'Only one header row can be used to stream xlsx files by ',
+            'data_read.read_data(). Exiting.......'
+        ]))
+
+    pddfs = {}
+    with ZipFile(filename) as xlsx:
+        names, sheet_paths, date1904 = _xlsx_workbook(xlsx)
+        if sheetnames is None:
+            sheets = names[0:1]  # read first sheet
+        elif sheetnames == []:  # empty list implies all sheets
+            sheets = names
+        else:
+            sheets = sheetnames
+        for sheet_name in sheets:
+            if sheet_name not in sheet_paths:
+                raise ValueError(''.join([
+                    'Worksheet ', sheet_name, ' cannot be found in ',
+                    filename, '. Exiting.......'
+                ]))
+        shared_strings = _xlsx_shared_strings(xlsx)
+        date_styles = _xlsx_date_styles(xlsx)
+
+        for sheet_name in sheets:
+            columns = None
+            blocks = []
+            rows = []
+            for ind, row in enumerate(_iter_xlsx_rows(
+                    xlsx, sheet_paths[sheet_name], shared_strings,
+                    date_styles, date1904
+                    )):
+                if header is not None and ind < header:
+                    continue
+                elif header is not None and ind == header:
+                    columns = row
+                    continue
+                rows.append(row)
+                if len(rows) == XLSX_BLOCK_SIZE:
+                    blocks.append(DataFrame(rows).infer_objects())
+                    rows = []
+                    _report_rows(
+                        callback, sheet_name, len(blocks)*XLSX_BLOCK_SIZE
+                    )
+            blocks.append(DataFrame(rows).infer_objects())
+            _report_rows(
+                callback, sheet_name,
+                (len(blocks)-1)*XLSX_BLOCK_SIZE+len(rows)
+            )
+            pddf = concat(blocks, ignore_index=True)
+            if columns is not None:
+                columns = columns+[None]*(pddf.shape[1]-len(columns))
+                pddf = pddf.reindex(columns=range(len(columns)))
+                pddf.columns = [
+                    ''.join(['Unnamed: ', str(ind)]) if col is None else col
+                    for ind, col in enumerate(columns)
+                ]
+            pddfs[sheet_name] = _time_config(
+                pddf, time_format, dateautodetect
+            )
+
     return pddfs
 
 
+def _xlsx_workbook(xlsx: ZipFile) -> tuple:
+    """
+        Return the list of the worksheet names in an xlsx file in order, a
+        dict of the paths of the worksheet xml files with the worksheet
+        names as the keys, and whether the dates are counted from 1904
+
+        Inputs:
+        ==========
+        xlsx: zipfile.ZipFile
+            opened xlsx file
+    """
+
+    targets = {}
+    with xlsx.open('xl/_rels/workbook.xml.rels') as xmlfile:
+        for event, elem in iterparse(xmlfile):
+            if _local_name(elem.tag) == 'Relationship':
+                targets[elem.get('Id')] = elem.get('Target')
+
+    sheet_paths = {}
+    date1904 = False
+    names = []
+    with xlsx.open('xl/workbook.xml') as xmlfile:
+        for event, elem in iterparse(xmlfile):
+            if _local_name(elem.tag) == 'workbookPr':
+                date1904 = elem.get('date1904') in ['1', 'true']
+            elif _local_name(elem.tag) == 'sheet':
+                target = [
+                    targets[elem.get(key)] for key in elem.keys()
+                    if _local_name(key) == 'id'
+                ][0]
+                if target.startswith('/'):
+                    path = target[1:]
+                else:
+                    path = normpath(posix_join('xl', target))
+                names.append(elem.get('name'))
+                sheet_paths[elem.get('name')] = path
+
+    return names, sheet_paths, date1904
+
+
+def _xlsx_shared_strings(xlsx: ZipFile) -> list:
+    """
+        Return the list of shared strings in an xlsx file
+
+        Inputs:
+        ==========
+        xlsx: zipfile.ZipFile
+            opened xlsx file
+    """
+
+    shared_strings = []
+    if 'xl/sharedStrings.xml' not in xlsx.namelist():
+        return shared_strings
+    with xlsx.open('xl/sharedStrings.xml') as xmlfile:
+        for event, elem in iterparse(xmlfile):
+            if _local_name(elem.tag) == 'si':
+                # join the text of all rich text runs, excluding the
+                # phonetic guides
+                texts = []
+                for node in elem:
+                    if _local_name(node.tag) == 't':
+                        texts.append(node.text or '')
+                    elif _local_name(node.tag) == 'r':
+                        texts.extend([
+                            run.text or '' for run in node
+                            if _local_name(run.tag) == 't'
+                        ])
+                shared_strings.append(''.join(texts))
+                elem.clear()
+
+    return shared_strings
+
+
+def _xlsx_date_styles(xlsx: ZipFile) -> set:
+    """
+        Return the set of indexes of the cell styles with date or time
+        number formats in an xlsx file
+
+        Inputs:
+        ==========
+        xlsx: zipfile.ZipFile
+            opened xlsx file
+    """
+
+    date_styles = set()
+    if 'xl/styles.xml' not in xlsx.namelist():
+        return date_styles
+    date_formats = set(XLSX_DATE_FORMAT_IDS)
+    in_cell_xfs = False
+    ind = 0
+    with xlsx.open('xl/styles.xml') as xmlfile:
+        for event, elem in iterparse(xmlfile, events=('start', 'end')):
+            name = _local_name(elem.tag)
+            if name == 'numFmt' and event == 'end':
+                # remove quoted text, colours and escaped characters
+                code = sub(
+                    r'"[^"]*"|\[[^\]]*\]|\\.', '',
+                    elem.get('formatCode', '')
+                ).lower()
+                if any([char in code for char in 'dmyhs']):
+                    date_formats.add(int(elem.get('numFmtId')))
+            elif name == 'cellXfs':
+                in_cell_xfs = event == 'start'
+            elif name == 'xf' and event == 'end' and in_cell_xfs:
+                if int(elem.get('numFmtId', 0)) in date_formats:
+                    date_styles.add(ind)
+                ind += 1
+
+    return date_styles
+
+
+def _iter_xlsx_rows(xlsx: ZipFile, path: str, shared_strings: list,
+                    date_styles: set, date1904: bool):
+    """
+        Yield the rows of a worksheet in an xlsx file as lists of values
+        one by one. The parsed rows are removed from memory right away.
+        Empty rows are skipped and empty cells are None
+
+        Inputs:
+        ==========
+        xlsx: zipfile.ZipFile
+            opened xlsx file
+
+        path: string
+            path to the xml file of the worksheet in the xlsx file
+
+        shared_strings: list
+            shared strings in the xlsx file
+
+        date_styles: set
+            indexes of the cell styles with date or time number formats
+
+        date1904: bool
+            if the dates are counted from 1904
+    """
+
+    epoch = datetime(1904, 1, 1) if date1904 else datetime(1899, 12, 30)
+    with xlsx.open(path) as xmlfile:
+        parent = None
+        for event, elem in iterparse(xmlfile, events=('start', 'end')):
+            name = _local_name(elem.tag)
+            if event == 'start':
+                if name == 'sheetData':
+                    parent = elem
+                continue
+            if name != 'row':
+                continue
+            row = []
+            for cell in elem:
+                if _local_name(cell.tag) != 'c':
+                    continue
+                colind = _xlsx_column_index(cell.get('r'), len(row))
+                row.extend([None]*(colind-len(row)))
+                row.append(_xlsx_cell_value(
+                    cell, shared_strings, date_styles, epoch
+                ))
+            if parent is not None:
+                parent.clear()  # free the parsed rows
+            if any([value is not None for value in row]):
+                yield row
+
+
+def _xlsx_cell_value(cell, shared_strings: list, date_styles: set,
+                     epoch: datetime):
+    """
+        Return the value of a cell element in a worksheet of an xlsx file.
+        Numbers in date or time formats are converted to datetime.datetime
+        and error values to float('nan')
+
+        Inputs:
+        ==========
+        cell: xml.etree.ElementTree.Element
+            cell element
+
+        shared_strings: list
+            shared strings in the xlsx file
+
+        date_styles: set
+            indexes of the cell styles with date or time number formats
+
+        epoch: datetime.datetime
+            the date of the serial number 0 in the xlsx file
+    """
+
+    celltype = cell.get('t', 'n')
+    text = None
+    for node in cell.iter():
+        if _local_name(node.tag) in ['v', 't']:
+            text = (text or '')+(node.text or '')
+    if text is None:
+        return None
+    if celltype == 's':
+        return shared_strings[int(text)]
+    elif celltype in ['str', 'inlineStr']:
+        return text
+    elif celltype == 'b':
+        return text == '1'
+    elif celltype == 'e':
+        return float('nan')
+    value = float(text)
+    if int(cell.get('s', 0)) in date_styles:
+        # convert the days and the fraction of a day separately and round
+        # the time to milliseconds like Excel
+        days, fraction = divmod(value, 1)
+        return epoch+timedelta(
+            days=days, milliseconds=round(fraction*86400e3)
+        )
+    elif value.is_integer() and '.' not in text and 'E' not in text.upper():
+        return int(text)
+    return value
+
+
+def _xlsx_column_index(ref: str, default: int) -> int:
+    """
+        Return the 0-indexed column index of a cell reference like 'AB12'
+
+        Inputs:
+        ==========
+        ref: string
+            cell reference. None if it is not given
+
+        default: int
+            column index to be returned if ref is None
+    """
+
+    if ref is None:
+        return default
+    colind = 0
+    for char in ref:
+        if not char.isalpha():
+            break
+        colind = colind*26+ord(char.upper())-ord('A')+1
+    return colind-1
+
+
+def _local_name(tag: str) -> str:
+    """
+        Return the name of an xml tag or attribute without its namespace
+
+        Inputs:
+        ==========
+        tag: string
+            name of the xml tag or attribute
+    """
+
+    return tag.rsplit('}', 1)[-1]
+
+
+def _mmap_cache_key(filename: str, header, time_format: str,
+                    sheetnames: list, dateautodetect: bool,
+                    sep: str) -> dict:
+    """
+        Return a dict that identifies the version of filename and the inputs
+        of read_data() for the cache of the parsed data
+
+        Inputs:
+        ==========
+        filename: string
+            path to the data file
+
+        header, time_format, sheetnames, dateautodetect, sep:
+            inputs of read_data()
+    """
+
+    filestat = stat(filename)
+    return {
+        'size': filestat.st_size, 'mtime': filestat.st_mtime,
+        'header': header, 'time_format': time_format,
+        'sheetnames': sheetnames, 'dateautodetect': dateautodetect,
+        'sep': sep
+    }
+
+
+def _content_cache_key(filename: str, header, time_format: str,
+                       sheetnames: list, dateautodetect: bool,
+                       sep: str) -> dict:
+    """
+        Return a dict that identifies the content of filename and the inputs
+        of read_data() for the cache of the parsed data in a cache
+        directory. The hash of both is stored in 'hash'
+
+        Inputs:
+        ==========
+        filename: string
+            path to the data file
+
+        header, time_format, sheetnames, dateautodetect, sep:
+            inputs of read_data()
+    """
+
+    filehash = sha1()
+    with open(filename, 'rb') as datafile:
+        for block in iter(lambda: datafile.read(HASH_BLOCK_SIZE), b''):
+            filehash.update(block)
+    cache_key = {
+        'content': filehash.hexdigest(), 'header': header,
+        'time_format': time_format, 'sheetnames': sheetnames,
+        'dateautodetect': dateautodetect, 'sep': sep
+    }
+    cache_key['hash'] = sha1(
+        dumps(cache_key, sort_keys=True).encode('utf-8')
+    ).hexdigest()
+    return cache_key
+
+
+def _evict_parse_cache(cache_dir: str, cache_size: int, keep: str):
+    """
+        Remove the least recently used data in cache_dir until its size is
+        not larger than cache_size
+
+        Inputs:
+        ==========
+        cache_dir: string
+            path to the cache directory
+
+        cache_size: int
+            maximum size of cache_dir in bytes
+
+        keep: string
+            name of the entry that must not be removed
+    """
+
+    entries = []
+    total_size = 0
+    for entry in listdir(cache_dir):
+        entrydir = join(cache_dir, entry)
+        try:
+            size = sum([
+                getsize(join(entrydir, name)) for name in listdir(entrydir)
+            ])
+            # use the time of the last use of the entry
+            used = getmtime(join(entrydir, 'cache.json'))
+        except OSError:  # incomplete entry
+            used = 0.0
+            size = 0
+        entries.append((used, size, entry))
+        total_size += size
+
+    for used, size, entry in sorted(entries):
+        if total_size <= cache_size:
+            break
+        if entry == keep:
+            continue
+        rmtree(join(cache_dir, entry), ignore_errors=True)
+        total_size -= size
+
+
+def _save_mmap_cache(cachedir: str, cache_key: dict, pddfs: dict) -> bool:
+    """
+        Save the time stamps and the values of the dataframes in pddfs as
+        numpy files in cachedir. Returns False if the dataframes cannot be
+        cached
+
+        Inputs:
+        ==========
+        cachedir: string
+            path to the cache directory
+
+        cache_key: dict
+            identity of the data file and the inputs of read_data()
+
+        pddfs: dict of pandas DataFrame
+            parsed dataframes from read_data()
+    """
+
+    sheets = []
+    for sheet_name in pddfs:
+        pddf = pddfs[sheet_name]
+        if not isinstance(pddf.index, DatetimeIndex) or not all([
+                is_numeric_dtype(pddf[col]) for col in pddf.columns
+                ]):
+            return False
+        sheets.append({
+            'name': sheet_name, 'index_name': pddf.index.name,
+            'columns': [
+                list(col) if isinstance(col, tuple) else col
+                for col in pddf.columns
+            ],
+            'multiindex': isinstance(pddf.columns, MultiIndex)
+        })
+
+    try:
+        makedirs(cachedir, exist_ok=True)
+        for ind, sheet_name in enumerate(pddfs):
+            pddf = pddfs[sheet_name]
+            save_npy(
+                join(cachedir, ''.join([str(ind), '.times.npy'])),
+                asarray(pddf.index, dtype='datetime64[ns]').view('int64')
+            )
+            # keep each column contiguous in the file
+            save_npy(
+                join(cachedir, ''.join([str(ind), '.values.npy'])),
+                asarray(pddf.values, dtype='float64', order='F')
+            )
+        # write the description last so that an incomplete cache is ignored
+        with open(join(cachedir, 'cache.json'), 'w') as jsonfile:
+            dump({'key': cache_key, 'sheets': sheets}, jsonfile)
+    except (OSError, TypeError, ValueError):  # cannot write the cache
+        return False
+
+    return True
+
+
+def _load_mmap_cache(cachedir: str, cache_key: dict) -> dict:
+    """
+        Map the time stamps and the values in cachedir into memory without
+        copying them and return them as a dict of pandas DataFrame like
+        read_data(). Returns None if there is no cache or the cache is out
+        of date
+
+        Inputs:
+        ==========
+        cachedir: string
+            path to the cache directory
+
+        cache_key: dict
+            identity of the data file and the inputs of read_data()
+    """
+
+    if not exists(join(cachedir, 'cache.json')):
+        return None
+    try:
+        with open(join(cachedir, 'cache.json')) as jsonfile:
+            description = load(jsonfile)
+        # compare the key after the same conversion to json, e.g. tuples
+        # to lists
+        if description['key'] != _json_round_trip(cache_key):
+            return None
+
+        pddfs = {}
+        for ind, sheet in enumerate(description['sheets']):
+            times = load_npy(
+                join(cachedir, ''.join([str(ind), '.times.npy'])),
+                mmap_mode='r'
+            )
+            # copy on write so that the dataframes can be modified without
+            # changing the cache
+            values = load_npy(
+                join(cachedir, ''.join([str(ind), '.values.npy'])),
+                mmap_mode='c'
+            )
+            if sheet['multiindex']:
+                columns = MultiIndex.from_tuples(
+                    [tuple(col) for col in sheet['columns']]
+                )
+            else:
+                columns = sheet['columns']
+            index = DatetimeIndex(times.view('datetime64[ns]'))
+            index.name = sheet['index_name']
+            pddfs[sheet['name']] = DataFrame(
+                values, index=index, columns=columns, copy=False
+            )
+    except (OSError, KeyError, ValueError):  # broken cache
+        return None
+
+    return pddfs
+
+
+def _json_round_trip(obj):
+    """
+        Return obj after converting it to json and back
+
+        Inputs:
+        ==========
+        obj:
+            object that can be converted to json
+    """
+
+    return loads(dumps(obj))
+
+
+def _read_columnar(filename: str, time_format: str,
+                   dateautodetect: bool) -> DataFrame:
+    """
+        Read a parquet, feather or arrow file and returns a pandas DataFrame
+        with time data as the index. The datetime index of a parquet file
+        or the first column of the file is used as the index and the
+        numeric columns are kept as they are. The time strings and the
+        other columns are only converted if they are stored as strings
+
+        Inputs:
+        ==========
+        filename: string
+            path to the data file
+
+        time_format: string
+            format of string in time if the time data are strings
+
+        dateautodetect: bool
+            detect the format of the date time automatically if the time
+            data are strings
+    """
+
+    if filename.split('.')[-1] == 'parquet':
+        pddf = read_parquet(filename)
+    else:
+        pddf = read_feather(filename)
+
+    if not isinstance(pddf.index, DatetimeIndex):
+        if is_string_dtype(pddf.iloc[:, 0]):
+            # time strings have to be parsed like csv files
+            return _time_config(pddf, time_format, dateautodetect)
+        pddf = pddf.set_index(pddf.columns[0])
+    if pddf.index.name is None:
+        pddf.index.name = 'Time'
+
+    # only convert the columns that are not numbers yet
+    for col in pddf.columns:
+        if not is_numeric_dtype(pddf[col]):
+            pddf[col] = to_numeric(pddf[col], errors='coerce')
+
+    return pddf
+
+
+def _time_config(pddf: DataFrame, time_format: str, dateautodetect: bool,
+                 inferred_format: str=None) -> DataFrame:
+    """
+        Preprocess the time string in a pandas DataFrame and returns
+        a pandas DataFrame
+
+        Inputs:
+        ==========
+        pddf: pandas DataFrame
+            dataframe with time strings in its first column
+
+        time_format: string
+            format of string in time
+
+        dateautodetect: bool
+            detect the format of the date time in the first column
+            automatically
+
+        inferred_format: string
+            format of string in time inferred from another chunk of the
+            same file for the automatic detection. '' if no format fits the
+            time strings. Default None which means that it is inferred from
+            pddf
+    """
+
+    # rename the first column name
+    pddf.columns = ['Time']+pddf.columns.tolist()[1:]
+
+    # make time column as the index. Convert the time strings at once only
+    # if all of them are strings, as pandas or the Excel readers may have
+    # converted some or all of them already
+    time_strings = infer_dtype(pddf['Time'], skipna=False) == 'string'
+    try:
+        if dateautodetect and time_strings:
+            pddf.loc[:, 'Time'] = _autodetect_time_strings(
+                pddf.loc[:, 'Time'], inferred_format
+            )
+        elif dateautodetect:
+            pddf.loc[:, 'Time'] = [
+                parse(timestr) for timestr in pddf.loc[:, 'Time']
+            ]
+        elif time_strings:
+            pddf.loc[:, 'Time'] = _parse_time_strings(
+                pddf.loc[:, 'Time'], time_format
+            )
+        else:
+            pddf.loc[:, 'Time'] = [
+                datetime.strptime(timestr, time_format)
+                for timestr in pddf.loc[:, 'Time']
+            ]
+    except TypeError:  # the time string has been converted by pandas
+        pass
+    pddf.set_index('Time', inplace=True)
+
+    # force convert all values to float64
+    pddf = pddf.convert_objects(convert_numeric=True)
+
+    return pddf
+
+
+def _parse_time_strings(timestrs: Series, time_format: str,
+                        errors: str='raise') -> Series:
+    """
+        Convert a pandas Series of time strings in time_format to datetime
+        values in one call instead of calling datetime.strptime() row by row.
+        Literal text after the last directive in time_format, e.g. ' CST' in
+        the default format, is removed from the strings first so that it
+        does not slow down the conversion. Returns a pandas Series
+
+        Inputs:
+        ==========
+        timestrs: pandas Series
+            time strings
+
+        time_format: string
+            format of string in time
+
+        errors: string
+            'raise' to raise an error for strings not in time_format or
+            'coerce' to return NaT for them. Default 'raise'
+    """
+
+    suffix = ''
+    if '%' in time_format:
+        suffix = time_format[time_format.rfind('%')+2:]
+    if suffix and timestrs.str.endswith(suffix, na=False).all():
+        timestrs = timestrs.str[:-len(suffix)]
+        time_format = time_format[:-len(suffix)]
+
+    return to_datetime(timestrs, format=time_format, errors=errors)
+
+
+def _autodetect_time_strings(timestrs: Series,
+                             inferred_format: str=None) -> Series:
+    """
+        Convert a pandas Series of time strings in an unknown format to
+        datetime values. One format is inferred for the whole Series and
+        used to convert all strings at once, and only the strings that do
+        not fit it are parsed one by one with dateutil. Returns a pandas
+        Series
+
+        Inputs:
+        ==========
+        timestrs: pandas Series
+            time strings
+
+        inferred_format: string
+            format of string in time inferred before. '' if no format fits
+            the time strings. Default None which means that it is inferred
+            from timestrs
+    """
+
+    if inferred_format is None:
+        inferred_format = _infer_time_format(timestrs)
+    if not inferred_format:
+        return Series(
+            [parse(timestr) for timestr in timestrs], index=timestrs.index
+        )
+
+    times = _parse_time_strings(timestrs, inferred_format, errors='coerce')
+    failed = times.isnull() & timestrs.notnull()
+    if failed.any():
+        times = times.astype(object)
+        times[failed] = [parse(timestr) for timestr in timestrs[failed]]
+        times = to_datetime(times)
+
+    return times
+
+
+def _infer_time_format(timestrs: Series) -> str:
+    """
+        Infer one format of string in time for a pandas Series of time
+        strings. The candidate formats that fit most of the first
+        INFER_SIZE strings are ranked by how often they agree with dateutil
+        and how many strings they fit, and the first one that fits a larger
+        sample of up to VALIDATE_SIZE strings across the Series is returned.
+        If none of them fits the larger sample, the one with the fewest
+        failures is returned. Returns '' if no format fits.
+
+        Inputs:
+        ==========
+        timestrs: pandas Series
+            time strings
+    """
+
+    timestrs = timestrs.dropna()
+    sample = [str(timestr) for timestr in timestrs.iloc[:INFER_SIZE]]
+    if len(sample) == 0:
+        return ''
+
+    # literal text at the end of all strings, e.g. a time zone like ' CST'
+    suffix = ''
+    last_words = set([timestr.split(' ')[-1] for timestr in sample])
+    if all([' ' in timestr for timestr in sample]) and \
+            len(last_words) == 1:
+        last_word = last_words.pop()
+        if last_word.isalpha() and last_word.upper() not in ['AM', 'PM']:
+            suffix = ''.join([' ', last_word])
+
+    # find the candidate formats that fit the sample
+    references = []
+    for timestr in sample:
+        try:
+            references.append(parse(timestr))
+        except (ValueError, OverflowError):
+            references.append(None)
+    candidates = []
+    for date_format in DATE_FORMATS:
+        for clock_format in CLOCK_FORMATS:
+            time_format = ''.join([date_format, clock_format, suffix])
+            num_fit = 0
+            agreement = 0
+            for timestr, reference in zip(sample, references):
+                try:
+                    time = datetime.strptime(timestr, time_format)
+                except ValueError:
+                    continue
+                num_fit += 1
+                agreement += time == reference
+            if num_fit*2 > len(sample):  # fit most of the sample
+                candidates.append((agreement, num_fit, time_format))
+    if len(candidates) == 0:
+        return ''
+
+    # validate the candidates with a larger sample across the Series
+    validation = timestrs.iloc[::max(1, len(timestrs)//VALIDATE_SIZE)]
+    best_format = ''
+    least_failures = len(validation)
+    for agreement, num_fit, time_format in sorted(
+            candidates, key=lambda candidate: (-candidate[0], -candidate[1])
+            ):
+        failures = _parse_time_strings(
+            validation, time_format, errors='coerce'
+        ).isnull().sum()
+        if failures == 0:
+            return time_format
+        if failures < least_failures:
+            best_format = time_format
+            least_failures = failures
+
+    return best_format
+
+
+def _sniff_csv(filename: str, header: int, sep: str) -> dict:
+    """
+        Inspect the first few KB of a csv file to detect its separator,
+        quoting and header row. Returns the keyword arguments for
+        pandas.read_csv()
+
+        Inputs:
+        ==========
+        filename: string
+            path to the csv file
+
+        header: int, list of ints, 'infer' or None
+            Row (0-indexed) to use for the column labels. 'infer' to detect
+            if the first row is a header row
+
+        sep: str
+            user-defined separator. None to detect it
+    """
+
+    with open(filename, newline='', errors='replace') as csvfile:
+        sample = csvfile.read(SNIFF_SIZE)
+    if len(sample) == SNIFF_SIZE:
+        # remove the incomplete last line
+        sample = sample[:max(sample.rfind('\n'), 0)]
+
+    sniffer = Sniffer()
+    try:
+        dialect = sniffer.sniff(sample, delimiters=',;\t')
+    except CsvError:  # cannot be determined from the sample
+        dialect = None
+    csv_kwargs = {'header': header, 'sep': sep}
+    if dialect is not None:
+        if sep is None:
+            csv_kwargs['sep'] = dialect.delimiter
+        csv_kwargs['quotechar'] = dialect.quotechar
+        csv_kwargs['skipinitialspace'] = dialect.skipinitialspace
+    elif sep is None:
+        # use the first separator that splits the first line
+        csv_kwargs['sep'] = '\t'
+        for delimiter in [',', ';']:
+            if delimiter in sample.split('\n')[0]:
+                csv_kwargs['sep'] = delimiter
+                break
+    if header == 'infer':
+        try:
+            csv_kwargs['header'] = 0 if sniffer.has_header(sample) else None
+        except CsvError:
+            csv_kwargs['header'] = 0
+
+    return csv_kwargs
+
+
+def _read_csv_chunks(filename: str, csv_kwargs: dict, chunksize: int,
+                     time_format: str, dateautodetect: bool):
+    """
+        Generator that reads a csv file chunk by chunk and yields pandas
+        DataFrame with at most chunksize rows and time data as the index
+
+        Inputs:
+        ==========
+        filename: string
+            path to the csv file
+
+        csv_kwargs: dict
+            keyword arguments for pandas.read_csv() from _sniff_csv()
+
+        chunksize: int
+            maximum number of rows in each chunk
+
+        time_format: string
+            format of string in time
+
+        dateautodetect: bool
+            detect the format of the date time in the first column
+            automatically
+    """
+
+    inferred_format = None
+    for pddf in read_csv(filename, chunksize=chunksize, **csv_kwargs):
+        # infer the time format once for all chunks
+        if dateautodetect and inferred_format is None and \
+                is_string_dtype(pddf.iloc[:, 0]):
+            inferred_format = _infer_time_format(pddf.iloc[:, 0])
+        yield _time_config(
+            pddf, time_format, dateautodetect, inferred_format
+        )
+
+
 def interpolate_with_s(mid_date: datetime, a_date: datetime, b_date: datetime,
                        a_value: float, b_value: float) -> float:
     """
@@ -285,7 +1699,9 @@ def interpolate_with_s(mid_date: datetime, a_date: datetime, b_date: datetime,
 # testing functions
 if __name__ == '__main__':
 
+    from os import remove
     from os.path import basename
+    from tempfile import mkdtemp
 
     # check to ensure that no float numbers are converted to string
     # accidentally
@@ -309,6 +1725,32 @@ if __name__ == '__main__':
     TEST_DFS = read_data(FILENAME, header=0, sheetnames=[])
     assert TEST_DFS['Sheet3'].columns.tolist()[0] == 'Price'
 
+    # testing streaming the worksheets of an xlsx file
+    STREAM_DFS = read_data(FILENAME, header=0, sheetnames=[], streaming=True)
+    assert list(STREAM_DFS.keys()) == list(TEST_DFS.keys())
+    for SHTNAME in TEST_DFS:
+        assert STREAM_DFS[SHTNAME].equals(TEST_DFS[SHTNAME])
+    STREAM_DFS = read_data(
+        FILENAME, header=0, sheetnames=['Sheet2'], streaming=True
+    )
+    assert list(STREAM_DFS.keys()) == ['Sheet2']
+
+    # testing parallel reading of the worksheets
+    PARALLEL_DFS = read_data(FILENAME, header=0, sheetnames=[], workers=2)
+    assert list(PARALLEL_DFS.keys()) == list(TEST_DFS.keys())
+    for SHTNAME in TEST_DFS:
+        assert PARALLEL_DFS[SHTNAME].equals(TEST_DFS[SHTNAME])
+    assert _excel_sheet_names(FILENAME) == list(TEST_DFS.keys())
+    # the worksheets of an xls file are listed and loaded one by one
+    assert _excel_sheet_names('../dat/missing_data.xls') == \
+        ['Sheet1', 'Sheet2', 'Sheet3']
+    assert _read_excel_sheet(
+        ('../dat/missing_data.xls', 'Sheet1', 0, '%m/%d/%y %I:%M:%S %p CST',
+         False)
+    ).equals(read_data(
+        '../dat/missing_data.xls', header=0, sheetnames=['Sheet1']
+    )['Sheet1'])
+
     # testing import with dates
     FILENAME = '../dat/date.csv'
     print('Testing file import by using ', FILENAME)
@@ -348,6 +1790,58 @@ if __name__ == '__main__':
             assert isnan(TEST_DF.loc[TEST_DF.index[0], 'Item 3'])
             assert TEST_DF.loc[TEST_DF.index[0], 'Item 4'] == 0.0
 
+    # test reading a csv file in chunks
+    FILENAME = '../dat/time_of_change-semicolon.csv'
+    print('Testing file import in chunks by using ', FILENAME)
+    SHTNAME = split(FILENAME)[-1].split('.')[0]
+    FULL_DF = read_data(FILENAME, header=0)[SHTNAME]
+    NUM_ROWS = 0
+    for CHUNK_DF in read_data(FILENAME, header=0, chunksize=50)[SHTNAME]:
+        assert CHUNK_DF.shape[0] <= 50
+        assert CHUNK_DF.columns.tolist() == FULL_DF.columns.tolist()
+        assert CHUNK_DF.index[0] == FULL_DF.index[NUM_ROWS]
+        NUM_ROWS += CHUNK_DF.shape[0]
+    assert NUM_ROWS == FULL_DF.shape[0]
+
+    # test the separator override and the detection of the header row
+    FILENAME = '../dat/time_of_change-semicolon.csv'
+    print('Testing file import with user-defined separator by using ',
+          FILENAME)
+    SHTNAME = split(FILENAME)[-1].split('.')[0]
+    TEST_DF = read_data(FILENAME, header='infer', sep=';')[SHTNAME]
+    assert TEST_DF.columns.tolist() == ['Item 1', 'Item 2', 'Item 3', 'Item 4']
+    assert TEST_DF.loc[TEST_DF.index[1], 'Item 3'] == 1.0
+    FILENAME = '../dat/time_of_change_noheader.csv'
+    print('Testing file import without header by using ', FILENAME)
+    SHTNAME = split(FILENAME)[-1].split('.')[0]
+    TEST_DF = read_data(FILENAME, header='infer')[SHTNAME]
+    assert isinstance(TEST_DF.index[0], Timestamp)
+    assert TEST_DF.loc[TEST_DF.index[0], 4] == 0.0
+
+    # test the conversion of time strings against datetime.strptime
+    FILENAME = '../dat/time_of_change.csv'
+    print('Testing time string conversion by using ', FILENAME)
+    TIMEFORMAT = '%m/%d/%y %I:%M:%S %p CST'
+    TEST_DF = read_data(FILENAME, header=0, time_format=TIMEFORMAT)[
+        'time_of_change'
+    ]
+    assert TEST_DF.index.tolist() == [
+        datetime.strptime(timestr, TIMEFORMAT)
+        for timestr in read_csv(FILENAME, header=0).iloc[:, 0]
+    ]
+
+    # test the automatic detection of time formats with day-first dates
+    TEST_TIMES = _autodetect_time_strings(Series(
+        ['12/01/2017 10:00', '13/01/2017 10:00', '14/01/2017 10:00']
+    ))
+    assert TEST_TIMES.tolist() == [
+        datetime(2017, 1, 12, 10, 0), datetime(2017, 1, 13, 10, 0),
+        datetime(2017, 1, 14, 10, 0)
+    ]
+    assert _infer_time_format(Series(
+        ['1/1/17 7:32:15 AM CST', '1/13/17 9:33:01 PM CST']
+    )) == '%m/%d/%y %I:%M:%S %p CST'
+
     # test for multi-header
     FILENAME = '../dat/time_of_change_multiheader.csv'
     print('Testing file import by using ', FILENAME)
@@ -360,4 +1854,109 @@ if __name__ == '__main__':
     assert isnan(TEST_DF.loc[TEST_DF.index[0], 'Item 3'])
     assert TEST_DF.loc[TEST_DF.index[0], 'Item 4'] == 0.0
 
+    # test for parquet and feather files with times and numbers or strings
+    FILENAME = '../dat/time_of_change.csv'
+    SHTNAME = split(FILENAME)[-1].split('.')[0]
+    TEST_DF = read_data(FILENAME, header=0)[SHTNAME]
+    TEST_DF.to_parquet('./testresult.parquet')
+    print('Testing file import by using ', './testresult.parquet')
+    PARQUET_DF = read_data('./testresult.parquet')['testresult']
+    assert PARQUET_DF.equals(TEST_DF)
+    remove('./testresult.parquet')
+    read_csv(FILENAME, dtype=str).to_feather('./testresult.feather')
+    print('Testing file import by using ', './testresult.feather')
+    FEATHER_DF = read_data('./testresult.feather')['testresult']
+    assert (FEATHER_DF.index == TEST_DF.index).all()
+    assert FEATHER_DF.fillna(-1).values.tolist() == \
+        TEST_DF.fillna(-1).values.tolist()
+    remove('./testresult.feather')
+
+    # test for the memory-mapped cache of the parsed data
+    FILENAME = '../dat/missing_data.xlsx'
+    print('Testing the cache of', FILENAME)
+    TEST_DFS = read_data(FILENAME, header=0, sheetnames=[])
+    for ind in range(2):  # write the cache and then read it
+        CACHE_DFS = read_data(
+            FILENAME, header=0, sheetnames=[], mmap_cache=True
+        )
+        assert list(CACHE_DFS.keys()) == list(TEST_DFS.keys())
+        for SHTNAME in TEST_DFS:
+            assert (CACHE_DFS[SHTNAME].index == TEST_DFS[SHTNAME].index).all()
+            assert CACHE_DFS[SHTNAME].columns.equals(TEST_DFS[SHTNAME].columns)
+            assert CACHE_DFS[SHTNAME].fillna(-1).values.tolist() == \
+                TEST_DFS[SHTNAME].fillna(-1).values.tolist()
+    # the cache is not used for other inputs
+    assert len(read_data(
+        FILENAME, header=0, mmap_cache=True
+    )) == 1
+    rmtree(''.join([FILENAME, '.cache']))
+
+    # test for the cache of the content of the files with a size limit
+    CACHE_DIR = mkdtemp()
+    for FILENAME in [
+            '../dat/time_of_change.csv', '../dat/time_of_change-trimmed.csv',
+            '../dat/time_of_change.csv'
+            ]:
+        SHTNAME = split(FILENAME)[-1].split('.')[0]
+        TEST_DF = read_data(FILENAME, header=0)[SHTNAME]
+        CACHE_DF = read_data(
+            FILENAME, header=0, cache_dir=CACHE_DIR, cache_size=10000
+        )[SHTNAME]
+        assert (CACHE_DF.index == TEST_DF.index).all()
+        assert CACHE_DF.fillna(-1).values.tolist() == \
+            TEST_DF.fillna(-1).values.tolist()
+        # only the last file is kept within the size
+        assert len(listdir(CACHE_DIR)) == 1
+    rmtree(CACHE_DIR)
+
+    # test for the number of rows and the phase reported to the callback
+    FILENAME = '../dat/missing_data.xlsx'
+    for STREAMING in [False, True]:
+        EVENTS = []
+        TEST_DFS = read_data(
+            FILENAME, header=0, sheetnames=[], streaming=STREAMING,
+            callback=EVENTS.append
+        )
+        assert [
+            (event['sheet'], event['rows']) for event in EVENTS[1:-1]
+        ] == [
+            (SHTNAME, TEST_DFS[SHTNAME].shape[0]) for SHTNAME in TEST_DFS
+        ]
+        assert EVENTS[0] == {
+            'event': 'phase_start', 'phase': 'read',
+            'elapsed': EVENTS[0]['elapsed']
+        }
+        assert EVENTS[-1]['event'] == 'phase_end'
+        assert sorted([event['elapsed'] for event in EVENTS]) == \
+            [event['elapsed'] for event in EVENTS]
+
+    # test for time columns already converted by the Excel readers
+    TIMES = [datetime(2017, 1, 1, 0, 0), datetime(2017, 1, 1, 0, 10)]
+    for DATEAUTODETECT in [False, True]:
+        TEST_DF = _time_config(DataFrame({
+            'Time': Series(TIMES, dtype=object), 'Value': [1, 2]
+        }), '%m/%d/%y %I:%M:%S %p CST', DATEAUTODETECT)
+        assert TEST_DF.index.tolist() == TIMES
+        # the strings are not converted if some times are converted
+        TEST_DF = _time_config(DataFrame({
+            'Time': Series(
+                [TIMES[0], '01/01/17 12:10:00 AM CST'], dtype=object
+            ), 'Value': [1, 2]
+        }), '%m/%d/%y %I:%M:%S %p CST', DATEAUTODETECT)
+        assert TEST_DF.index[0] == TIMES[0]
+        assert TEST_DF['Value'].tolist() == [1, 2]
+
+    # test for the report of the time and the memory of the reading
+    FILENAME = '../dat/time_of_change.csv'
+    TEST_DFS = read_data(FILENAME, header=0, instrument=True)
+    with open(''.join([FILENAME, '.report.json'])) as jsonfile:
+        REPORT = load(jsonfile)
+    assert REPORT['function'] == 'read_data'
+    assert list(REPORT['phases']['read']['sheets'].keys()) == \
+        list(TEST_DFS.keys())
+    assert 0 < REPORT['phases']['read']['wall_time'] <= REPORT['wall_time']
+    assert 0 < REPORT['phases']['read']['peak_memory'] <= \
+        REPORT['peak_memory']
+    remove(''.join([FILENAME, '.report.json']))
+
     print('All functions in', basename(__file__), 'are ok')
@@ -9,17 +9,59 @@
 """
 
 # import python internal libraries
-from datetime import datetime, timedelta
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from hashlib import sha1
+from json import dump as json_dump, load as json_load
+from multiprocessing import Pool, RawArray, cpu_count
 from math import isnan
 from ntpath import split
-from os import mkdir
-from os.path import dirname
+from os import listdir, mkdir, remove, stat, utime
+from os.path import dirname, getmtime, getsize, join, splitext
 from pathlib import Path
+from pickle import UnpicklingError
+from re import sub
+from tempfile import TemporaryDirectory
 
 # import third party libraries
-from pandas import DataFrame, ExcelWriter, to_numeric, Series
+from numpy import arange, asarray, concatenate, empty, flatnonzero, \
+    frombuffer, full, memmap, minimum, nan, nanmin, ndarray
+from pandas import DataFrame, DatetimeIndex, ExcelWriter, Timestamp, \
+    concat, notnull, read_pickle, to_numeric
+from pandas.util import hash_pandas_object
+from xlsxwriter import Workbook
 
 # import user-defined libraries
+from data_read import record_instrumentation, report_phase, \
+    start_instrumentation, stop_instrumentation, timed_callback, \
+    write_instrumentation
+
+
+# define global variables
+# validity of the entries in a dataframe for resampling. times are the time
+# stamps in int64 nanoseconds, values are float64 arrays of each column,
+# masks are boolean arrays of the valid entries in each column and
+# positions are the row positions of the valid entries in each column
+ValidValues = namedtuple(
+    'ValidValues', ['times', 'values', 'masks', 'positions']
+)
+CSV_BUFFER_SIZE = 1048576  # size of the write buffer of csv files in bytes
+RESULT_CACHE_SIZE = 1073741824  # default maximum size of a cache directory
+# maximum size of the new dataframes kept in memory by the graphical user
+# interfaces
+RESULT_CACHE_MEMORY = 268435456
+# new dataframes kept in memory by convert_df() as (dataframe, size) with
+# the least recently used ones first
+_RESULT_CACHE = OrderedDict()
+# extensions of the files of columnar formats
+COLUMNAR_EXTS = ['parquet', 'feather', 'arrow']
+# maximum number of rows in an Excel worksheet
+XLSX_MAX_ROWS = 1048576
+# shared memory of resample_columns_in_parallel() as numpy arrays in the
+# worker processes
+_COLUMN_WORKER_ARRAYS = {}
 
 
 # write functions
@@ -28,7 +70,13 @@ def convert_df(datadfs: dict, start_time: datetime=None,
                step: bool=True, ini_val: int=1,
                output_file: str=None, sep: str=';',
                output_timestring: str='%Y/%m/%d %H:%M:%S',
-               outputtimevalue: str='None') -> dict:
+               outputtimevalue: str='None', dtype: str='float64',
+               workers: int=None, column_workers: int=None,
+               constant_memory: bool=False, csv_dir: bool=False,
+               compression=None, cache_memory: int=0, cache_dir: str=None,
+               cache_size: int=RESULT_CACHE_SIZE,
+               incremental: bool=False, callback=None,
+               instrument: bool=False) -> dict:
     """
         This function converts a dataframe which data are converted according
         to time of change of values to data collected at fixed intervals.
@@ -38,393 +86,1764 @@ def convert_df(datadfs: dict, start_time: datetime=None,
 
         Inputs:
         ==========
-        datadfs: dict of pandas DataFrame
-            dict of pandas DataFrame which index are datetime.datetime objects
-            and contain data collected at time of change
+        datadfs: dict of pandas DataFrame
+            dict of pandas DataFrame which index are datetime.datetime objects
+            and contain data collected at time of change
+
+        start_time: datetime.datetime
+            user-defined starting time. If none is input, use the first
+            datetime given in the datadf
+
+        end_time: datatime.datetime
+            users preliminary override of the ending time of the new
+            dataframe. If it does not fit the intervals correctly, it may
+            get updated
+
+        interval: float
+            user-defined time interval for the new data frame in seconds.
+            Default 600 (10 minutes)
+
+        step: bool
+            if the data should be considered to be step functions. Default
+            True. Indeed this input won't work until further notice.
+
+        ini_val: int
+            the assumption to the initial value of a column if the start time
+            is before the occurrence of the initial value in the column.
+                1: Use the minimum value in the trend
+                2: Use the first value in the trend
+                3: Fill in float('nan') (blank) values
+            Default 1
+
+        output_file: str
+            the path where the dataframe should be output as a csv, xls,
+            xlsx, parquet, feather or arrow depending on the extension.
+            Multiple worksheets are written to a directory at the path
+            without the extension for parquet, feather and arrow. Default
+            None: no output
+
+        sep: str
+            separator in the csv. Default ';'
+
+        output_timestring: str
+            format time string in the output file. Default '%Y-%m-%d %H:%M:%S'
+
+        outputtimevalue: str
+            format time string into values from the user-defined start time.
+            Default 'None'. Can be 'seconds', 'minutes', 'hours' and 'days'
+
+        dtype: str
+            data type of the values in the new dataframes. 'float64' or
+            'float32' to halve the memory used by the new dataframes.
+            Default 'float64'
+
+        workers: int
+            number of worker processes to convert the worksheets in
+            parallel. Default None: convert the worksheets one by one
+
+        column_workers: int
+            number of worker processes to resample the columns of each
+            worksheet in parallel for wide worksheets. Only used when the
+            worksheets are not converted in parallel with workers. Default
+            None: resample the columns one by one
+
+        constant_memory: bool
+            write an xlsx output file row by row so that only one row is
+            kept in memory at a time. Worksheets with more rows than an
+            Excel worksheet can hold are always written in this way.
+            Default False
+
+        csv_dir: bool
+            write every worksheet to its own csv file in parallel when
+            output_file is a csv file. The files are named after the
+            worksheets in a directory at the path of output_file without
+            the extension. Default False: only the first worksheet is
+            written to output_file
+
+        compression: str or dict
+            compression of a parquet, feather or arrow output file, e.g.
+            'snappy', 'zstd' or 'lz4'. A dict of compression with the column
+            names as keys can be used for a parquet file. Default None: the
+            default compression of pyarrow
+
+        cache_memory: int
+            maximum size in bytes of the new dataframes kept in memory for
+            later calls with the same worksheet and the same inputs that
+            change the new dataframe, so that only the output file is
+            written in those calls. The least recently used dataframes are
+            removed first. Default 0: no dataframes are kept in memory
+
+        cache_dir: str
+            directory to keep the new dataframes for later calls like
+            cache_memory. Default None: no dataframes are kept on disk
+
+        cache_size: int
+            maximum size of cache_dir in bytes. The least recently used
+            dataframes are removed first. Default RESULT_CACHE_SIZE
+
+        incremental: bool
+            append the new data of the first worksheet to the csv
+            output_file of an earlier call instead of converting all data
+            again. The state of the conversion is kept in a file at the path
+            of output_file with '.state.json' at the end. Only the rows
+            newer than the last time stamp of the earlier call are
+            resampled, and the rows that the new data may change are
+            written again. The data up to that time stamp must not change.
+            If end_time is given, the inputs change or the new data change
+            the earlier rows, e.g. the minimum value for ini_val 1, the
+            whole output file is written again. The output file is the same
+            as the one converted from all data at once. Returns a dict with
+            the rows written to output_file only. Default False
+
+        callback: function
+            function called with a dict of the progress. It is called with
+            {'event': 'phase_start', 'phase': 'resample'} and {'event':
+            'phase_end', 'phase': 'resample'} around the resampling, with
+            the same dicts with 'write' around the writing of output_file,
+            after each column is resampled with {'event': 'column', 'sheet':
+            name of the worksheet, 'column': name of the column, 'done':
+            number of columns resampled in the worksheet, 'total': number
+            of columns in the worksheet, 'rows': number of rows of the new
+            dataframe}, and after each worksheet is written to output_file
+            with {'event': 'sheet', 'sheet': name of the worksheet, 'done':
+            number of worksheets written, 'total': number of worksheets,
+            'rows': number of rows written}. All dicts have 'elapsed', the
+            seconds since the beginning of the call. The columns of the
+            worksheets converted in worker processes are reported when
+            their worksheets are done. Exceptions raised by it stop the
+            conversion so that it can be cancelled between the columns and
+            the worksheets. Not used with incremental. Default None
+
+        instrument: bool
+            record the wall time, the CPU time and the peak memory of the
+            resampling, the writing and each worksheet in them and write
+            them to a JSON report at the path of output_file with
+            '.report.json' at the end. See data_read.start_instrumentation()
+            for the report. The worksheets converted in worker processes
+            are not measured. Not used with incremental. Default False
+    """
+
+    if dtype not in ['float64', 'float32']:
+        raise ValueError('Wrong data type for the new dataframes')
+    if instrument and not incremental:
+        if output_file is None:
+            raise ValueError(
+                'An output file is needed for the instrumentation report'
+            )
+        # measure the conversion through the events of the callback
+        state = start_instrumentation('convert_df')
+        try:
+            final_dfs = convert_df(
+                datadfs, start_time=start_time, end_time=end_time,
+                interval=interval, step=step, ini_val=ini_val,
+                output_file=output_file, sep=sep,
+                output_timestring=output_timestring,
+                outputtimevalue=outputtimevalue, dtype=dtype,
+                workers=workers, column_workers=column_workers,
+                constant_memory=constant_memory, csv_dir=csv_dir,
+                compression=compression, cache_memory=cache_memory,
+                cache_dir=cache_dir, cache_size=cache_size,
+                callback=partial(record_instrumentation, state, callback)
+            )
+        finally:
+            stop_instrumentation(state)
+        write_instrumentation(state, ''.join([output_file, '.report.json']))
+        return final_dfs
+    if incremental:
+        return _convert_incremental(
+            datadfs, start_time, end_time, interval, step, ini_val,
+            output_file, sep, output_timestring, outputtimevalue, dtype
+        )
+
+    # add the elapsed time to the events
+    if callback is not None:
+        callback = timed_callback(callback)
+    report_phase(callback, 'resample', 'start')
+
+    # the sheets share the same new time stamps. Find them sheet by sheet as
+    # the first sheet may define the starting and the ending time
+    grids = []
+    for sheet_name in datadfs:
+        datadf = datadfs[sheet_name]
+        datadf.sort_index(inplace=True)  # sort the data
+        if start_time is None:
+            start_time = datadf.index[0]  # intialize it with the dataframe
+
+        # calculate the new time stamps and the ending time directly
+        if end_time is None:
+            new_times = new_time_stamps(start_time, datadf.index[-1], interval)
+        else:
+            new_times = new_time_stamps(start_time, end_time, interval)
+        end_time = Timestamp(new_times[-1])
+        grids.append(new_times)
+
+    # reuse the new dataframes of earlier calls with the same inputs
+    sheet_names = [sheet_name for sheet_name in datadfs]
+    results = {}
+    if cache_memory > 0 or cache_dir is not None:
+        cache_keys = {
+            sheet_name: _result_cache_key(
+                datadfs[sheet_name], new_times, step, ini_val, dtype,
+                outputtimevalue
+            )
+            for sheet_name, new_times in zip(sheet_names, grids)
+        }
+        for sheet_name in sheet_names:
+            final_df = _get_cached_result(
+                cache_keys[sheet_name], cache_memory, cache_dir
+            )
+            if final_df is not None:
+                results[sheet_name] = final_df
+                _report_columns(callback, sheet_name, final_df)
+
+    # resample the other sheets independently, in worker processes if
+    # needed
+    sheet_parallel = workers is not None and workers > 1 and \
+        len(sheet_names)-len(results) > 1
+    if sheet_parallel:
+        # worker processes cannot start their own worker processes
+        column_workers = None
+    new_names = [name for name in sheet_names if name not in results]
+    jobs = [
+        (datadfs[sheet_name], new_times, step, ini_val, dtype,
+         outputtimevalue, column_workers)
+        for sheet_name, new_times in zip(sheet_names, grids)
+        if sheet_name not in results
+    ]
+    if sheet_parallel:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map returns the results in the order of the sheets
+            new_results = []
+            for sheet_name, final_df in zip(
+                    new_names, executor.map(_resample_sheet_job, jobs)
+                    ):
+                new_results.append(final_df)
+                _report_columns(callback, sheet_name, final_df)
+    else:
+        new_results = [
+            resample_sheet(*job, callback=None if callback is None else
+                           partial(_report_sheet, callback, sheet_name))
+            for sheet_name, job in zip(new_names, jobs)
+        ]
+    for sheet_name, final_df in zip(new_names, new_results):
+        results[sheet_name] = final_df
+        if cache_memory > 0 or cache_dir is not None:
+            _cache_result(
+                cache_keys[sheet_name], final_df, cache_memory, cache_dir,
+                cache_size
+            )
+    final_dfs = {}
+    for sheet_name in sheet_names:
+        final_dfs[sheet_name] = results[sheet_name]
+    report_phase(callback, 'resample', 'end')
+
+    # output new file
+    if output_file is not None:
+        report_phase(callback, 'write', 'start')
+        mkdir_if_not_exist(dirname(output_file))
+        # write float32 values with their own precision instead of the
+        # noise digits from the conversion to float64
+        float_format = '%.7g' if dtype == 'float32' else None
+        if output_file.split('.')[-1] == 'csv' and csv_dir:
+            write_csv_dir(
+                final_dfs, splitext(output_file)[0], sep, output_timestring,
+                float_format, callback
+            )
+        elif output_file.split('.')[-1] == 'csv':
+            _write_csv(
+                final_dfs[sheet_names[0]], output_file, sep,
+                output_timestring, float_format
+            )
+            _report_written(
+                callback, sheet_names[0], 1, 1, len(final_dfs[sheet_names[0]])
+            )
+        elif output_file.split('.')[-1] == 'xlsx' and (
+                constant_memory or max([
+                    len(final_dfs[sheet_name]) for sheet_name in final_dfs
+                ]) > XLSX_MAX_ROWS-1
+                ):
+            write_xlsx_constant_memory(
+                final_dfs, output_file, float_format, callback
+            )
+        elif output_file.split('.')[-1] == 'xlsx':
+            # need to open and close files if engine is not 'xlsxWriter'
+            with ExcelWriter(
+                    output_file, engine='xlsxwriter'
+                    ) as writer:
+                for ind, sheet_name in enumerate(final_dfs):
+                    if len(sheet_name) < 30:
+                        final_dfs[sheet_name].to_excel(
+                            writer, sheet_name, float_format=float_format
+                        )
+                    else:  # limit to excel worksheet name
+                        final_dfs[sheet_name].to_excel(writer, ''.join([
+                            sheet_name[0:27], '(', '%02i' % (ind+1), ')'
+                        ]), float_format=float_format)
+                    _report_written(
+                        callback, sheet_name, ind+1, len(final_dfs),
+                        len(final_dfs[sheet_name])
+                    )
+                writer.save()
+        elif output_file.split('.')[-1] == 'xls':
+            with ExcelWriter(
+                    output_file, engine='xlwt'
+                    ) as writer:
+                for ind, sheet_name in enumerate(final_dfs):
+                    if len(sheet_name) < 30:
+                        final_dfs[sheet_name].to_excel(
+                            writer, sheet_name, float_format=float_format
+                        )
+                    else:  # limit to excel worksheet name
+                        final_dfs[sheet_name].to_excel(writer, ''.join([
+                            sheet_name[0:27], '(', '%02i' % (ind+1), ')'
+                        ]), float_format=float_format)
+                    _report_written(
+                        callback, sheet_name, ind+1, len(final_dfs),
+                        len(final_dfs[sheet_name])
+                    )
+                writer.save()
+        elif output_file.split('.')[-1] in COLUMNAR_EXTS and \
+                len(final_dfs) > 1:
+            # one file for each worksheet as a file holds one table only
+            _write_dir(
+                final_dfs, splitext(output_file)[0],
+                output_file.split('.')[-1], _write_columnar, compression,
+                callback=callback
+            )
+        elif output_file.split('.')[-1] in COLUMNAR_EXTS:
+            _write_columnar(
+                final_dfs[sheet_names[0]], output_file, compression
+            )
+            _report_written(
+                callback, sheet_names[0], 1, 1, len(final_dfs[sheet_names[0]])
+            )
+        else:
+            raise ValueError('Wrong extension for output file')
+        report_phase(callback, 'write', 'end')
+
+    return final_dfs
+
+
+def _convert_incremental(datadfs: dict, start_time: datetime,
+                         end_time: datetime, interval: float, step: bool,
+                         ini_val: int, output_file: str, sep: str,
+                         output_timestring: str, outputtimevalue: str,
+                         dtype: str) -> dict:
+    """
+        Append the new data of the first worksheet in datadfs to the csv
+        output file of an earlier call of convert_df() with incremental
+        set to True, or write the whole output file if it cannot be
+        appended. Returns a dict of pandas DataFrame with the rows written
+        to the output file. Please see convert_df() for the inputs
+    """
+
+    if output_file is None or output_file.split('.')[-1] != 'csv':
+        raise ValueError('Wrong extension for output file')
+    sheet_name = [ent for ent in datadfs.keys()][0]
+    datadf = datadfs[sheet_name]
+    datadf.sort_index(inplace=True)  # sort the data
+    if start_time is None:
+        start_time = datadf.index[0]  # intialize it with the dataframe
+    float_format = '%.7g' if dtype == 'float32' else None
+    state_file = ''.join([output_file, '.state.json'])
+    inputs = {
+        'start_ns': Timestamp(start_time).value,
+        'interval_ns': _interval_ns(interval), 'step': step,
+        'ini_val': ini_val, 'dtype': dtype, 'sep': sep,
+        'output_timestring': output_timestring,
+        'outputtimevalue': outputtimevalue,
+        'columns': [str(col) for col in datadf.columns]
+    }
+    datatimes = _to_ns(datadf.index)
+    state = None
+    if end_time is None:
+        state = _load_incremental_state(state_file, output_file, inputs)
+    if state is not None and (datatimes == state['last_ns']).sum() != \
+            state['last_count']:
+        state = None  # the rows at the last time stamp are changed
+    if state is not None:
+        valid = find_valid_values(datadf[datatimes > state['last_ns']])
+
+    # the earlier rows before the first valid value of a column change if
+    # the new data give the first valid value or a smaller minimum value
+    if state is not None and ini_val != 3:
+        for ind, column in enumerate(state['columns']):
+            values = valid.values[ind][valid.positions[ind]]
+            if len(values) > 0 and (column['first'] is None or (
+                    ini_val == 1 and column['leading'] and
+                    values.min() < column['min']
+                    )):
+                state = None
+                break
+
+    if state is None:  # convert all data
+        valid = find_valid_values(datadf)
+        new_times = new_time_stamps(
+            start_time, datadf.index[-1] if end_time is None else end_time,
+            interval
+        )
+        settled_rows = 0
+        columns = [{'times': [], 'values': []} for col in datadf.columns]
+    else:
+        if datatimes[-1] <= state['last_ns']:  # nothing to append
+            return {sheet_name: DataFrame(columns=datadf.columns)}
+        new_times = new_time_stamps(start_time, datadf.index[-1], interval)
+        settled_rows = state['settled_rows']
+        columns = state['columns']
+
+    # resample the rows that may be changed with the valid values carried
+    # from the earlier call and the new valid values
+    out_times = new_times[settled_rows:]
+    new_values = empty((len(out_times), datadf.shape[1]), dtype=dtype,
+                       order='F')
+    times_list = []
+    values_list = []
+    firsts = []
+    mins = []
+    for ind, column in enumerate(columns):
+        times = concatenate([
+            asarray(column['times'], dtype='int64'),
+            valid.times[valid.positions[ind]]
+        ])
+        values = concatenate([
+            asarray(column['values'], dtype='float64'),
+            valid.values[ind][valid.positions[ind]]
+        ])
+        first = column.get('first')
+        if first is None and len(times) > 0:
+            first = [int(times[0]), float(values[0])]
+        colmin = column.get('min')
+        if len(values) > 0:
+            colmin = float(values.min()) if colmin is None else \
+                min(colmin, float(values.min()))
+        if state is None:
+            new_values[:, ind] = _resample_column(
+                times, values, out_times, step, ini_val
+            )
+        else:
+            new_values[:, ind] = _resample_column(
+                times, values, out_times, step, 3
+            )
+            if first is not None and ini_val != 3:
+                # fill in the rows before the first valid value
+                new_values[out_times < first[0], ind] = \
+                    first[1] if ini_val == 2 else colmin
+        times_list.append(times)
+        values_list.append(values)
+        firsts.append(first)
+        mins.append(colmin)
+    final_df = DataFrame(
+        new_values, index=DatetimeIndex(out_times.view('datetime64[ns]')),
+        columns=datadf.columns
+    )
+    if outputtimevalue != 'None':
+        _set_time_values(
+            final_df, Timestamp(new_times[0]), outputtimevalue
+        )
+
+    # keep the values that the next call needs
+    new_state = _incremental_state(
+        times_list, values_list, firsts, mins, new_times, int(datatimes[-1]),
+        int((datatimes == datatimes[-1]).sum()), step
+    )
+    new_state['inputs'] = inputs
+    split_row = new_state['settled_rows']-settled_rows
+
+    # write the rows after the rows that are not changed
+    if state is None:
+        mkdir_if_not_exist(dirname(output_file))
+        csvfile = open(output_file, 'w', buffering=CSV_BUFFER_SIZE)
+    else:
+        with open(output_file, 'rb+') as oldfile:
+            oldfile.truncate(state['settled_offset'])
+        csvfile = open(output_file, 'a', buffering=CSV_BUFFER_SIZE)
+    with csvfile:
+        final_df.iloc[:split_row].to_csv(
+            csvfile, sep=sep, date_format=output_timestring,
+            float_format=float_format, header=(state is None)
+        )
+        new_state['settled_offset'] = csvfile.tell()
+        final_df.iloc[split_row:].to_csv(
+            csvfile, sep=sep, date_format=output_timestring,
+            float_format=float_format, header=False
+        )
+    if end_time is None or state is not None:
+        _save_incremental_state(state_file, output_file, new_state)
+    elif Path(state_file).exists():  # the output file is not appendable
+        remove(state_file)
+
+    return {sheet_name: final_df}
+
+
+def _incremental_state(times_list: list, values_list: list, firsts: list,
+                       mins: list, new_times: ndarray, last_ns: int,
+                       last_count: int, step: bool) -> dict:
+    """
+        Return the state of an incremental conversion as a dict. The rows
+        up to the settled time stamp cannot be changed by newer data. For
+        each column, the valid values after the settled time stamp and the
+        last two before it are kept to resample the rows after it again
+
+        Inputs:
+        ==========
+        times_list: list of numpy.ndarray
+            time stamps of the valid values that may be needed in each
+            column in int64 nanoseconds
+
+        values_list: list of numpy.ndarray
+            valid values at the time stamps in times_list
+
+        firsts: list
+            time stamp and value of the first valid value of each column.
+            None for a column without valid values
+
+        mins: list
+            minimum valid value of each column. None for a column without
+            valid values
+
+        new_times: numpy.ndarray
+            new time stamps in int64 nanoseconds
+
+        last_ns: int
+            time stamp of the last row of the data in nanoseconds
+
+        last_count: int
+            number of rows of the data at last_ns
+
+        step: bool
+            if the data are considered to be step functions
+    """
+
+    # rows after the last valid value of a column are extrapolated or
+    # blank until a newer valid value is found
+    settled_ns = last_ns
+    if not step:
+        settled_ns = min([last_ns]+[
+            int(times[-1]) for times in times_list if len(times) > 0
+        ])
+
+    columns = []
+    for times, values, first, colmin in zip(
+            times_list, values_list, firsts, mins
+            ):
+        pos = max(0, times.searchsorted(settled_ns, side='right')-2)
+        columns.append({
+            'times': times[pos:].tolist(), 'values': values[pos:].tolist(),
+            'first': first, 'min': colmin,
+            'leading': first is not None and bool(first[0] > new_times[0])
+        })
+
+    return {
+        'last_ns': last_ns, 'last_count': last_count,
+        'settled_rows': int(new_times.searchsorted(settled_ns, side='right')),
+        'columns': columns
+    }
+
+
+def _load_incremental_state(state_file: str, output_file: str,
+                            inputs: dict) -> dict:
+    """
+        Return the state of an incremental conversion kept in state_file.
+        Returns None if it does not exist, it is for other inputs or
+        output_file is changed after it is kept
+
+        Inputs:
+        ==========
+        state_file: str
+            path to the state file
+
+        output_file: str
+            path to the csv output file
+
+        inputs: dict
+            inputs of the conversion
+    """
+
+    try:
+        with open(state_file) as jsonfile:
+            state = json_load(jsonfile)
+        filestat = stat(output_file)
+    except (OSError, ValueError):
+        return None
+    if state.get('inputs') != inputs or \
+            state.get('size') != filestat.st_size or \
+            state.get('mtime') != filestat.st_mtime:
+        return None
+    return state
+
+
+def _save_incremental_state(state_file: str, output_file: str,
+                            state: dict):
+    """
+        Save the state of an incremental conversion to state_file together
+        with the size and the modification time of output_file
+
+        Inputs:
+        ==========
+        state_file: str
+            path to the state file
+
+        output_file: str
+            path to the csv output file
+
+        state: dict
+            state from _incremental_state()
+    """
+
+    filestat = stat(output_file)
+    state['size'] = filestat.st_size
+    state['mtime'] = filestat.st_mtime
+    with open(state_file, 'w') as jsonfile:
+        json_dump(state, jsonfile)
+
+
+def convert_chunks(chunks, output_file: str, start_time: datetime=None,
+                   end_time: datetime=None, interval: float=600,
+                   step: bool=True, ini_val: int=1, sep: str=';',
+                   output_timestring: str='%Y/%m/%d %H:%M:%S',
+                   outputtimevalue: str='None', dtype: str='float64',
+                   chunksize: int=100000) -> int:
+    """
+        This function converts data collected at time of change that arrive
+        in chunks, e.g. from data_read.read_data() with chunksize, to data
+        collected at fixed intervals and writes them to a csv file without
+        keeping the whole worksheet in memory. The last valid values of each
+        column are carried from chunk to chunk and the resampled values are
+        kept in temporary files until the initial values are known. The
+        output file is the same as the one from convert_df() with the same
+        inputs. Returns the number of rows in the output file.
+
+        Inputs:
+        ==========
+        chunks: iterable of pandas DataFrame
+            chunks of the same worksheet in chronological order which index
+            are datetime.datetime objects and contain data collected at time
+            of change
+
+        output_file: str
+            the path where the new data should be output as a csv
+
+        start_time: datetime.datetime
+            user-defined starting time. If none is input, use the first
+            datetime given in the first chunk
+
+        end_time: datatime.datetime
+            users preliminary override of the ending time of the new
+            data. If it does not fit the intervals correctly, it may
+            get updated
+
+        interval: float
+            user-defined time interval for the new data in seconds.
+            Default 600 (10 minutes)
+
+        step: bool
+            if the data should be considered to be step functions. Default
+            True
+
+        ini_val: int
+            the assumption to the initial value of a column if the start time
+            is before the occurrence of the initial value in the column.
+                1: Use the minimum value in the trend
+                2: Use the first value in the trend
+                3: Fill in float('nan') (blank) values
+            Default 1
+
+        sep: str
+            separator in the csv. Default ';'
+
+        output_timestring: str
+            format time string in the output file. Default '%Y-%m-%d %H:%M:%S'
+
+        outputtimevalue: str
+            format time string into values from the user-defined start time.
+            Default 'None'. Can be 'seconds', 'minutes', 'hours' and 'days'
+
+        dtype: str
+            data type of the new values. 'float64' or 'float32'. Default
+            'float64'
+
+        chunksize: int
+            number of rows written to the output file at a time. Default
+            100000
+    """
+
+    if dtype not in ['float64', 'float32']:
+        raise ValueError('Wrong data type for the new dataframes')
+    if output_file.split('.')[-1] != 'csv':
+        raise ValueError('Wrong extension for output file')
+
+    with TemporaryDirectory() as tmpdir:
+        # resample the chunks one by one
+        stream = None
+        carry = None  # rows at the last time stamp of the previous chunk
+        for chunk in chunks:
+            if chunk.shape[0] == 0:
+                continue
+            chunk = chunk.sort_index()
+            if stream is None:
+                if start_time is None:
+                    start_time = chunk.index[0]
+                stream = _ResampleStream(
+                    chunk.columns, start_time, end_time, interval, step,
+                    dtype, tmpdir
+                )
+                block = chunk
+            elif chunk.index[0] < carry.index[0]:
+                raise ValueError('The chunks are not in chronological order')
+            else:
+                block = concat([carry, chunk])
+            # keep the rows at the last time stamp for the next chunk because
+            # they may be duplicated by the rows in the next chunk
+            split_ind = block.index.searchsorted(block.index[-1])
+            carry = block.iloc[split_ind:]
+            stream.feed(
+                block.iloc[:split_ind], Timestamp(carry.index[0]).value
+            )
+            if stream.is_complete():
+                break  # no more new time stamps
+        if stream is None:
+            raise ValueError('No data to be converted')
+        if not stream.is_complete():
+            stream.finish(carry)
+        stream.fill_initial_values(ini_val)
+
+        # output new file chunk by chunk
+        mkdir_if_not_exist(dirname(output_file))
+        # write float32 values with their own precision instead of the
+        # noise digits from the conversion to float64
+        float_format = '%.7g' if dtype == 'float32' else None
+        with open(output_file, 'w') as csvfile:
+            for ind, final_df in enumerate(stream.iter_dataframes(chunksize)):
+                if outputtimevalue != 'None':
+                    _set_time_values(
+                        final_df, Timestamp(stream.start_ns), outputtimevalue
+                    )
+                final_df.to_csv(
+                    csvfile, sep=sep, date_format=output_timestring,
+                    float_format=float_format, header=(ind == 0)
+                )
+
+    return stream.num
+
+
+class _ResampleStream:
+    """
+        Resample the valid values of a worksheet arriving chunk by chunk to
+        new time stamps. The resampled values of each column are appended to
+        a binary file in a temporary directory as soon as they are known, and
+        the last two valid values of each column are carried to the next
+        chunk. The new time stamps before the first valid values are kept as
+        NaN until fill_initial_values() is called.
+    """
+
+    def __init__(self, columns, start_time: datetime, end_time: datetime,
+                 interval: float, step: bool, dtype: str, tmpdir: str):
+        """
+            Initialize the state of the resampling
+
+            Inputs:
+            ==========
+            columns: pandas Index
+                column names of the worksheet
+
+            start_time: datetime.datetime
+                first new time stamp
+
+            end_time: datetime.datetime
+                the time that the last new time stamp should reach. None if
+                it is the last time stamp of the data
+
+            interval: float
+                time interval between the new time stamps in seconds
+
+            step: bool
+                if the data should be considered to be step functions
+
+            dtype: str
+                data type of the new values
+
+            tmpdir: str
+                path to the directory of the binary files
+        """
+
+        self.columns = columns
+        self.start_ns = Timestamp(start_time).value
+        self.interval_ns = _interval_ns(interval)
+        self.num = None  # number of new time stamps
+        if end_time is not None:
+            self.num = _num_intervals(
+                self.start_ns, Timestamp(end_time).value, self.interval_ns
+            )+1
+        self.step = step
+        self.dtype = dtype
+        self.paths = [
+            join(tmpdir, ''.join(['col', str(ind), '.bin']))
+            for ind in range(len(columns))
+        ]
+        # resampling state of each column
+        self.next_inds = [0]*len(columns)  # next new time stamp to resample
+        self.last_times = [
+            empty(0, dtype='int64') for ind in range(len(columns))
+        ]  # time stamps of the last two valid values
+        self.last_values = [
+            empty(0, dtype='float64') for ind in range(len(columns))
+        ]  # the last two valid values
+        self.first_times = [None]*len(columns)
+        self.first_values = [None]*len(columns)
+        self.min_values = [nan]*len(columns)
+
+    def end_ns(self) -> int:
+        """
+            Return the last new time stamp in nanoseconds. None if it is not
+            known yet
+        """
+
+        if self.num is None:
+            return None
+        return self.start_ns+(self.num-1)*self.interval_ns
+
+    def is_complete(self) -> bool:
+        """
+            Return True if all new time stamps have been resampled
+        """
+
+        return self.num is not None and \
+            all([ind == self.num for ind in self.next_inds])
+
+    def feed(self, datadf: DataFrame, frontier_ns: int=None):
+        """
+            Resample the new time stamps that depend on the data in datadf
+            only and the data before it
+
+            Inputs:
+            ==========
+            datadf: pandas DataFrame
+                sorted chunk of the worksheet after the previous chunk
+
+            frontier_ns: int
+                time stamp of the next data in nanoseconds. None if datadf
+                is the last chunk of the worksheet
+        """
+
+        # number of new time stamps before the next data
+        if frontier_ns is None:
+            num_front = self.num
+        else:
+            num_front = max(
+                0, -((self.start_ns-frontier_ns)//self.interval_ns)
+            )
+            if self.num is not None:
+                num_front = min(num_front, self.num)
+
+        valid = find_valid_values(datadf)
+        end_ns = self.end_ns()
+        for ind in range(len(self.columns)):
+            new_times = valid.times[valid.positions[ind]]
+            new_values = valid.values[ind][valid.positions[ind]]
+            if len(new_times) > 0:
+                if self.first_times[ind] is None:
+                    self.first_times[ind] = new_times[0]
+                    self.first_values[ind] = new_values[0]
+                # minimum value until the ending time
+                if end_ns is not None:
+                    trend = new_values[
+                        :new_times.searchsorted(end_ns, side='right')
+                    ]
+                else:
+                    trend = new_values
+                if len(trend) > 0:
+                    self.min_values[ind] = nanmin(
+                        [self.min_values[ind], trend.min()]
+                    )
+            times = concatenate([self.last_times[ind], new_times])
+            values = concatenate([self.last_values[ind], new_values])
+            self.last_times[ind] = times[-2:]
+            self.last_values[ind] = values[-2:]
+
+            # interpolation also needs the next valid value of each new time
+            # stamp except at the end
+            num_next = num_front
+            if not self.step and frontier_ns is not None and len(times) > 0:
+                num_next = min(num_next, max(
+                    0, (times[-1]-self.start_ns)//self.interval_ns+1
+                ))
+            if num_next <= self.next_inds[ind]:
+                continue
+            new_stamps = self.start_ns+arange(
+                self.next_inds[ind], num_next, dtype='int64'
+            )*self.interval_ns
+            if self.step:
+                result = resample_as_step(times, values, new_stamps, 3)
+            else:
+                result = resample_by_interpolation(
+                    times, values, new_stamps, 3
+                )
+            with open(self.paths[ind], 'ab') as binfile:
+                result.astype(self.dtype).tofile(binfile)
+            self.next_inds[ind] = num_next
+
+    def finish(self, datadf: DataFrame):
+        """
+            Resample all remaining new time stamps with the last chunk of the
+            worksheet
+
+            Inputs:
+            ==========
+            datadf: pandas DataFrame
+                the last sorted chunk of the worksheet
+        """
+
+        if self.num is None:  # end at the last time stamp of the data
+            self.num = _num_intervals(
+                self.start_ns, Timestamp(datadf.index[-1]).value,
+                self.interval_ns
+            )+1
+        self.feed(datadf)
+
+    def fill_initial_values(self, ini_val: int):
+        """
+            Fill in the new time stamps before the first valid value of each
+            column according to the initial value assumption. Columns
+            without valid values before the ending time remain NaN
+
+            Inputs:
+            ==========
+            ini_val: int
+                the assumption to the initial value. 1 for the minimum value
+                in the trend, 2 for the first value and 3 for float('nan')
+        """
+
+        if ini_val not in [1, 2]:
+            return
+        for ind in range(len(self.columns)):
+            first_time = self.first_times[ind]
+            if first_time is None or first_time > self.end_ns():
+                continue
+            num_ini = max(
+                0, -((self.start_ns-first_time)//self.interval_ns)
+            )
+            if num_ini == 0:
+                continue
+            newvalues = memmap(
+                self.paths[ind], dtype=self.dtype, mode='r+',
+                shape=(self.num,)
+            )
+            if ini_val == 1:
+                newvalues[:num_ini] = self.min_values[ind]
+            else:
+                newvalues[:num_ini] = self.first_values[ind]
+            newvalues.flush()
+            del newvalues
+
+    def iter_dataframes(self, chunksize: int):
+        """
+            Generator that yields the resampled data as pandas DataFrame
+            with at most chunksize rows each and the new time stamps as the
+            index
+
+            Inputs:
+            ==========
+            chunksize: int
+                maximum number of rows in each pandas DataFrame
+        """
+
+        newvalues = [
+            memmap(path, dtype=self.dtype, mode='r', shape=(self.num,))
+            for path in self.paths
+        ]
+        for row_ini in range(0, self.num, chunksize):
+            row_end = min(row_ini+chunksize, self.num)
+            new_times = self.start_ns+arange(
+                row_ini, row_end, dtype='int64'
+            )*self.interval_ns
+            new_array = empty(
+                (row_end-row_ini, len(self.columns)), dtype=self.dtype,
+                order='F'
+            )
+            for ind, colvalues in enumerate(newvalues):
+                new_array[:, ind] = colvalues[row_ini:row_end]
+            yield DataFrame(
+                new_array,
+                index=DatetimeIndex(new_times.view('datetime64[ns]')),
+                columns=self.columns
+            )
+
+
+def _result_cache_key(datadf: DataFrame, new_times: ndarray, step: bool,
+                      ini_val: int, dtype: str, outputtimevalue: str) -> str:
+    """
+        Return a hash of the content of a dataframe and the inputs of
+        resample_sheet() that change the new dataframe
+
+        Inputs:
+        ==========
+        datadf: pandas DataFrame
+            dataframe to be resampled
+
+        new_times: numpy.ndarray
+            sorted new time stamps in int64 nanoseconds
+
+        step, ini_val, dtype, outputtimevalue:
+            inputs of resample_sheet()
+    """
+
+    datahash = sha1(hash_pandas_object(datadf, index=True).values.tobytes())
+    datahash.update(repr([
+        [str(col) for col in datadf.columns], int(new_times[0]),
+        int(new_times[-1]), len(new_times), step, ini_val, dtype,
+        outputtimevalue
+    ]).encode('utf-8'))
+    return datahash.hexdigest()
+
+
+def _get_cached_result(cache_key: str, cache_memory: int,
+                       cache_dir: str) -> DataFrame:
+    """
+        Return a copy of the new dataframe kept for cache_key in memory or
+        in cache_dir. Returns None if it is not kept
+
+        Inputs:
+        ==========
+        cache_key: str
+            hash from _result_cache_key()
+
+        cache_memory: int
+            maximum size in bytes of the new dataframes kept in memory
+
+        cache_dir: str
+            directory of the new dataframes kept on disk. None if they are
+            not kept on disk
+    """
+
+    if cache_key in _RESULT_CACHE:
+        _RESULT_CACHE.move_to_end(cache_key)  # most recently used
+        return _RESULT_CACHE[cache_key][0].copy()
+    if cache_dir is None:
+        return None
+
+    cache_file = join(cache_dir, ''.join([cache_key, '.pkl']))
+    try:
+        final_df = read_pickle(cache_file)
+        utime(cache_file)  # mark it as the most recently used one
+    except (OSError, EOFError, UnpicklingError):  # not kept or broken
+        return None
+    if cache_memory > 0:
+        _keep_result_in_memory(cache_key, final_df.copy(), cache_memory)
+    return final_df
+
+
+def _cache_result(cache_key: str, final_df: DataFrame, cache_memory: int,
+                  cache_dir: str, cache_size: int):
+    """
+        Keep a copy of a new dataframe in memory and in cache_dir within
+        their sizes by removing the least recently used dataframes
+
+        Inputs:
+        ==========
+        cache_key: str
+            hash from _result_cache_key()
+
+        final_df: pandas DataFrame
+            new dataframe to be kept
+
+        cache_memory: int
+            maximum size in bytes of the new dataframes kept in memory
+
+        cache_dir: str
+            directory of the new dataframes kept on disk. None if they are
+            not kept on disk
+
+        cache_size: int
+            maximum size of cache_dir in bytes
+    """
+
+    if cache_memory > 0:
+        _keep_result_in_memory(cache_key, final_df.copy(), cache_memory)
+    if cache_dir is None:
+        return
+
+    try:
+        mkdir_if_not_exist(cache_dir)
+        final_df.to_pickle(join(cache_dir, ''.join([cache_key, '.pkl'])))
+        cache_files = [
+            (getmtime(join(cache_dir, name)),
+             getsize(join(cache_dir, name)), name)
+            for name in listdir(cache_dir) if name.endswith('.pkl')
+        ]
+        total_size = sum([size for used, size, name in cache_files])
+        for used, size, name in sorted(cache_files):
+            if total_size <= cache_size:
+                break
+            if name != ''.join([cache_key, '.pkl']):
+                remove(join(cache_dir, name))
+                total_size -= size
+    except OSError:  # the cache is not available
+        pass
+
+
+def _keep_result_in_memory(cache_key: str, final_df: DataFrame,
+                           cache_memory: int):
+    """
+        Keep a new dataframe in memory and remove the least recently used
+        ones until the total size is not larger than cache_memory. The
+        dataframe is not kept if it is larger than cache_memory
+
+        Inputs:
+        ==========
+        cache_key: str
+            hash from _result_cache_key()
+
+        final_df: pandas DataFrame
+            new dataframe to be kept
+
+        cache_memory: int
+            maximum size in bytes of the new dataframes kept in memory
+    """
+
+    size = int(final_df.memory_usage(index=True).sum())
+    if size > cache_memory:
+        return
+    _RESULT_CACHE[cache_key] = (final_df, size)
+    _RESULT_CACHE.move_to_end(cache_key)
+    total_size = sum([entry[1] for entry in _RESULT_CACHE.values()])
+    while total_size > cache_memory:
+        old_key, (old_df, old_size) = _RESULT_CACHE.popitem(last=False)
+        total_size -= old_size
+
+
+def _resample_sheet_job(job: tuple) -> DataFrame:
+    """
+        Unpack the inputs of resample_sheet() from a tuple so that it can be
+        mapped over worker processes
+
+        Inputs:
+        ==========
+        job: tuple
+            inputs of resample_sheet() in order
+    """
+
+    return resample_sheet(*job)
+
+
+def _report_sheet(callback, sheet_name: str, event: dict):
+    """
+        Add the name of the worksheet to an event of resample_sheet() and
+        pass it to callback of convert_df()
+
+        Inputs:
+        ==========
+        callback: function
+            function to be called as in convert_df()
+
+        sheet_name: str
+            name of the worksheet
+
+        event: dict
+            progress of resample_sheet()
+    """
+
+    event['sheet'] = sheet_name
+    callback(event)
+
+
+def _report_columns(callback, sheet_name: str, final_df: DataFrame):
+    """
+        Tell callback that all columns of a worksheet are resampled at once
+        if it is given
+
+        Inputs:
+        ==========
+        callback: function
+            function to be called as in convert_df(). None for nothing
+
+        sheet_name: str
+            name of the worksheet
+
+        final_df: pandas DataFrame
+            new dataframe of the worksheet
+    """
+
+    if callback is not None:
+        for ind, col in enumerate(final_df.columns):
+            callback({
+                'event': 'column', 'sheet': sheet_name, 'column': col,
+                'done': ind+1, 'total': final_df.shape[1],
+                'rows': final_df.shape[0]
+            })
+
+
+def _report_written(callback, sheet_name: str, done: int, total: int,
+                    rows: int):
+    """
+        Tell callback that a worksheet is written if it is given
+
+        Inputs:
+        ==========
+        callback: function
+            function to be called as in convert_df(). None for nothing
+
+        sheet_name: str
+            name of the worksheet
+
+        done: int
+            number of worksheets written so far
+
+        total: int
+            number of worksheets to be written
+
+        rows: int
+            number of rows written for the worksheet
+    """
+
+    if callback is not None:
+        callback({
+            'event': 'sheet', 'sheet': sheet_name, 'done': done,
+            'total': total, 'rows': rows
+        })
+
+
+def resample_sheet(datadf: DataFrame, new_times: ndarray, step: bool=True,
+                   ini_val: int=1, dtype: str='float64',
+                   outputtimevalue: str='None',
+                   column_workers: int=None, callback=None) -> DataFrame:
+    """
+        Resample a dataframe collected at time of change to the new time
+        stamps and return the new dataframe. If a column contains no valid
+        values, it returns a column of NaN values instead.
+
+        Inputs:
+        ==========
+        datadf: pandas DataFrame
+            dataframe sorted by its index of datetime.datetime objects
+
+        new_times: numpy.ndarray
+            sorted new time stamps in int64 nanoseconds
+
+        step: bool
+            if the data should be considered to be step functions. Default
+            True
+
+        ini_val: int
+            the assumption to the initial value of a column if the start time
+            is before the occurrence of the initial value in the column.
+                1: Use the minimum value in the trend
+                2: Use the first value in the trend
+                3: Fill in float('nan') (blank) values
+            Default 1
+
+        dtype: str
+            data type of the values in the new dataframe. Default 'float64'
+
+        outputtimevalue: str
+            format time string into values from the first new time stamp.
+            Default 'None'. Can be 'seconds', 'minutes', 'hours' and 'days'
+
+        column_workers: int
+            number of worker processes to resample the columns in parallel.
+            Default None: resample the columns one by one
+
+        callback: function
+            function called with a dict like {'event': 'column', 'column':
+            name of the column, 'done': number of columns resampled,
+            'total': number of columns, 'rows': number of new time stamps}
+            after each column is resampled, or
+            for all columns at once when they are resampled in parallel.
+            Exceptions raised by it stop the resampling. Default None
+    """
+
+    # check the validity of all entries once and resample each column
+    # with its valid values with sorted searches instead of walking
+    # through the rows. Fill in the preallocated array column by column
+    valid = find_valid_values(datadf)
+    if column_workers is not None and column_workers > 1 and \
+            datadf.shape[1] > 1:
+        new_values = resample_columns_in_parallel(
+            valid, new_times, step, ini_val, column_workers
+        ).astype(dtype, copy=False)
+        if callback is not None:
+            for ind, col in enumerate(datadf.columns):
+                callback({
+                    'event': 'column', 'column': col, 'done': ind+1,
+                    'total': datadf.shape[1], 'rows': len(new_times)
+                })
+    else:
+        new_values = empty(
+            (len(new_times), datadf.shape[1]), dtype=dtype, order='F'
+        )
+        for ind in range(datadf.shape[1]):
+            new_values[:, ind] = _resample_column(
+                valid.times[valid.positions[ind]],
+                valid.values[ind][valid.positions[ind]],
+                new_times, step, ini_val
+            )
+            if callback is not None:
+                callback({
+                    'event': 'column', 'column': datadf.columns[ind],
+                    'done': ind+1, 'total': datadf.shape[1],
+                    'rows': len(new_times)
+                })
+
+    # create the new dataframe with the correct indexes and column names
+    final_df = DataFrame(
+        new_values, index=DatetimeIndex(new_times.view('datetime64[ns]')),
+        columns=datadf.columns
+    )
+
+    # change time format as needed
+    if outputtimevalue != 'None':
+        _set_time_values(final_df, final_df.index[0], outputtimevalue)
+
+    return final_df
+
+
+def _resample_column(times: ndarray, values: ndarray, new_times: ndarray,
+                     step: bool, ini_val: int) -> ndarray:
+    """
+        Resample the valid values of a column to the new time stamps as step
+        functions or by interpolation
+
+        Inputs:
+        ==========
+        times: numpy.ndarray
+            sorted time stamps of the valid values in int64 nanoseconds
+
+        values: numpy.ndarray
+            valid float64 values at the time stamps in times
+
+        new_times: numpy.ndarray
+            sorted new time stamps in int64 nanoseconds
+
+        step: bool
+            if the data should be considered to be step functions
+
+        ini_val: int
+            the assumption to the initial value. 1 for the minimum value in
+            the trend, 2 for the first value and 3 for float('nan')
+    """
+
+    if step:  # assume step function
+        return resample_as_step(times, values, new_times, ini_val)
+    # run interpolation
+    return resample_by_interpolation(times, values, new_times, ini_val)
+
+
+def resample_columns_in_parallel(valid: ValidValues, new_times: ndarray,
+                                 step: bool=True, ini_val: int=1,
+                                 workers: int=2) -> ndarray:
+    """
+        Resample the columns in valid to the new time stamps in worker
+        processes and return the float64 values in a numpy array with one
+        column per column in valid in the same order. The values, the
+        validity masks and the results are kept in shared memory and each
+        worker process only receives the range of columns to resample.
+
+        Inputs:
+        ==========
+        valid: ValidValues
+            validity of the entries of a dataframe from find_valid_values()
+
+        new_times: numpy.ndarray
+            sorted new time stamps in int64 nanoseconds
+
+        step: bool
+            if the data should be considered to be step functions. Default
+            True
+
+        ini_val: int
+            the assumption to the initial value. 1 for the minimum value in
+            the trend, 2 for the first value and 3 for float('nan').
+            Default 1
+
+        workers: int
+            number of worker processes. Default 2
+    """
+
+    numrows = len(valid.times)
+    numcols = len(valid.values)
+    numtimes = len(new_times)
+
+    # copy the inputs column by column to shared memory
+    shared_times = RawArray('q', numrows)
+    frombuffer(shared_times, dtype='int64')[:] = valid.times
+    shared_values = RawArray('d', numrows*numcols)
+    shared_masks = RawArray('b', numrows*numcols)
+    values = frombuffer(shared_values, dtype='float64')
+    masks = frombuffer(shared_masks, dtype='bool')
+    for ind in range(numcols):
+        values[ind*numrows:(ind+1)*numrows] = valid.values[ind]
+        masks[ind*numrows:(ind+1)*numrows] = valid.masks[ind]
+    shared_times_new = RawArray('q', numtimes)
+    frombuffer(shared_times_new, dtype='int64')[:] = new_times
+    shared_results = RawArray('d', numtimes*numcols)
+
+    # split the columns into about equal contiguous shards
+    workers = min(workers, numcols)
+    bounds = [numcols*ind//workers for ind in range(workers+1)]
+    shards = [
+        (bounds[ind], bounds[ind+1], step, ini_val)
+        for ind in range(workers)
+    ]
+    pool = Pool(
+        workers, initializer=_init_column_worker,
+        initargs=(shared_times, shared_values, shared_masks,
+                  shared_times_new, shared_results)
+    )
+    try:
+        pool.map(_resample_column_shard, shards)
+    finally:
+        pool.close()
+        pool.join()
+
+    # the results of each column are contiguous
+    return frombuffer(shared_results, dtype='float64').reshape(
+        (numtimes, numcols), order='F'
+    )
+
+
+def _init_column_worker(shared_times, shared_values, shared_masks,
+                        shared_times_new, shared_results):
+    """
+        Keep the shared memory of resample_columns_in_parallel() as numpy
+        arrays in the worker process
+
+        Inputs:
+        ==========
+        shared_times: multiprocessing.RawArray
+            time stamps of the entries in int64 nanoseconds
+
+        shared_values: multiprocessing.RawArray
+            float64 values of the entries column after column
+
+        shared_masks: multiprocessing.RawArray
+            validity of the entries column after column
+
+        shared_times_new: multiprocessing.RawArray
+            new time stamps in int64 nanoseconds
+
+        shared_results: multiprocessing.RawArray
+            resampled float64 values column after column
+    """
+
+    times = frombuffer(shared_times, dtype='int64')
+    new_times = frombuffer(shared_times_new, dtype='int64')
+    _COLUMN_WORKER_ARRAYS.update({
+        'times': times,
+        'values': frombuffer(shared_values, dtype='float64').reshape(
+            (len(times), -1), order='F'
+        ),
+        'masks': frombuffer(shared_masks, dtype='bool').reshape(
+            (len(times), -1), order='F'
+        ),
+        'new_times': new_times,
+        'results': frombuffer(shared_results, dtype='float64').reshape(
+            (len(new_times), -1), order='F'
+        )
+    })
+
+
+def _resample_column_shard(shard: tuple):
+    """
+        Resample a range of columns in the shared memory of the worker
+        process and write the results to the shared memory
+
+        Inputs:
+        ==========
+        shard: tuple
+            index of the first column, index after the last column, step
+            and ini_val
+    """
+
+    first, last, step, ini_val = shard
+    arrays = _COLUMN_WORKER_ARRAYS
+    for ind in range(first, last):
+        positions = flatnonzero(arrays['masks'][:, ind])
+        arrays['results'][:, ind] = _resample_column(
+            arrays['times'][positions], arrays['values'][positions, ind],
+            arrays['new_times'], step, ini_val
+        )
+
+
+def write_csv_dir(final_dfs: dict, output_dir: str, sep: str=';',
+                  output_timestring: str='%Y/%m/%d %H:%M:%S',
+                  float_format: str=None, callback=None):
+    """
+        Write each pandas DataFrame in a dict to its own csv file named
+        after its key in output_dir. The files are written in parallel
+        threads. Characters that cannot be used in file names are replaced
+        by '_', and '_2', '_3', etc. are added to the names that are the
+        same as an earlier one after that
+
+        Inputs:
+        ==========
+        final_dfs: dict of pandas DataFrame
+            dataframes to be written with key values being the names of the
+            worksheets
+
+        output_dir: str
+            path to the directory of the csv files
+
+        sep: str
+            separator in the csv. Default ';'
+
+        output_timestring: str
+            format time string in the output file. Default '%Y/%m/%d %H:%M:%S'
+
+        float_format: str
+            format string of the float values. Default None
+
+        callback: function
+            function called after each file is written like in convert_df().
+            Default None
+    """
+
+    _write_dir(
+        final_dfs, output_dir, 'csv', _write_csv, sep, output_timestring,
+        float_format, callback=callback
+    )
+
+
+def _write_dir(final_dfs: dict, output_dir: str, ext: str, write_func,
+               *args, callback=None):
+    """
+        Write each pandas DataFrame in a dict to its own file named after
+        its key in output_dir with write_func in parallel threads.
+        Characters that cannot be used in file names are replaced by '_',
+        and '_2', '_3', etc. are added to the names that are the same as an
+        earlier one after that, ignoring the case, so that no two threads
+        write to the same file
+
+        Inputs:
+        ==========
+        final_dfs: dict of pandas DataFrame
+            dataframes to be written with key values being the names of the
+            worksheets
+
+        output_dir: str
+            path to the directory of the files
+
+        ext: str
+            extension of the files
+
+        write_func: function
+            function that writes a dataframe to the path in its first two
+            inputs
+
+        args:
+            other inputs of write_func
+
+        callback: function
+            function called after each file is written like in convert_df().
+            The files waiting for a thread are not written if it raises an
+            exception. Default None
+    """
+
+    # find all file names before writing any file
+    file_names = []
+    for sheet_name in final_dfs:
+        base_name = sub(r'[\\/:*?"<>|]', '_', str(sheet_name))
+        file_name = base_name
+        count = 1
+        while file_name.lower() in [name.lower() for name in file_names]:
+            count += 1
+            file_name = ''.join([base_name, '_', str(count)])
+        file_names.append(file_name)
+
+    mkdir_if_not_exist(output_dir)
+    with ThreadPoolExecutor(
+            max_workers=max(1, min(len(final_dfs), cpu_count()))
+            ) as executor:
+        futures = [
+            executor.submit(
+                write_func, final_dfs[sheet_name], join(output_dir, ''.join([
+                    file_name, '.', ext
+                ])), *args
+            )
+            for sheet_name, file_name in zip(final_dfs, file_names)
+        ]
+        try:
+            for ind, (sheet_name, future) in enumerate(
+                    zip(final_dfs, futures)
+                    ):
+                future.result()  # raise the errors in the threads
+                _report_written(
+                    callback, sheet_name, ind+1, len(futures),
+                    len(final_dfs[sheet_name])
+                )
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+
+def _write_columnar(final_df: DataFrame, output_file: str, compression):
+    """
+        Write a pandas DataFrame to a parquet, feather or arrow file
+        according to the extension of output_file. The column names are
+        written as strings. The time stamps are kept as the index of a
+        parquet file and as the first column 'Time' of a feather or arrow
+        file
+
+        Inputs:
+        ==========
+        final_df: pandas DataFrame
+            dataframe to be written
 
-        start_time: datetime.datetime
-            user-defined starting time. If none is input, use the first
-            datetime given in the datadf
+        output_file: str
+            path to the file
 
-        end_time: datatime.datetime
-            users preliminary override of the ending time of the new
-            dataframe. If it does not fit the intervals correctly, it may
-            get updated
+        compression: str or dict
+            compression of the file. None for the default compression
+    """
 
-        interval: float
-            user-defined time interval for the new data frame in seconds.
-            Default 600 (10 minutes)
+    if not all([isinstance(col, str) for col in final_df.columns]):
+        final_df = final_df.rename(columns=str)
+    kwargs = {} if compression is None else {'compression': compression}
+    if output_file.split('.')[-1] == 'parquet':
+        final_df.to_parquet(output_file, **kwargs)
+    else:  # feather files cannot store the index
+        if final_df.index.name is None:
+            final_df = final_df.rename_axis('Time')
+        final_df.reset_index().to_feather(output_file, **kwargs)
 
-        step: bool
-            if the data should be considered to be step functions. Default
-            True. Indeed this input won't work until further notice.
 
-        ini_val: int
-            the assumption to the initial value of a column if the start time
-            is before the occurrence of the initial value in the column.
-                1: Use the minimum value in the trend
-                2: Use the first value in the trend
-                3: Fill in float('nan') (blank) values
-            Default 1
+def _write_csv(final_df: DataFrame, output_file: str, sep: str,
+               output_timestring: str, float_format: str):
+    """
+        Write a pandas DataFrame to a csv file through a large write buffer
+
+        Inputs:
+        ==========
+        final_df: pandas DataFrame
+            dataframe to be written
 
         output_file: str
-            the path where the dataframe should be output as a csv, xls
-            or xlsx depending on the extension. Default None: no output
+            path to the csv file
 
         sep: str
-            separator in the csv. Default ';'
+            separator in the csv
 
         output_timestring: str
-            format time string in the output file. Default '%Y-%m-%d %H:%M:%S'
+            format time string in the output file
 
-        outputtimevalue: str
-            format time string into values from the user-defined start time.
-            Default 'None'. Can be 'seconds', 'minutes', 'hours' and 'days'
+        float_format: str
+            format string of the float values
     """
 
-    final_dfs = {}
-    for sheet_name in datadfs:
-        datadf = datadfs[sheet_name]
-        datadf.sort_index(inplace=True)  # sort the data
-        if start_time is None:
-            start_time = datadf.index[0]  # intialize it with the dataframe
+    with open(output_file, 'w', buffering=CSV_BUFFER_SIZE) as csvfile:
+        final_df.to_csv(
+            csvfile, sep=sep, date_format=output_timestring,
+            float_format=float_format
+        )
 
-        # calculate the ending index for the new dataframe
-        num = 1
-        if end_time is None:
-            while start_time+timedelta(seconds=interval*num) < \
-                    datadf.index[-1]:
-                num += 1
-        else:
-            while start_time+timedelta(seconds=interval*num) < end_time:
-                num += 1
-        end_time = start_time+timedelta(seconds=interval*num)
-
-        # create the new dataframe with the correct indexes and column names
-        final_df = DataFrame(index=[
-            start_time+timedelta(seconds=interval*ind) for ind in range(num+1)
-        ], columns=datadf.columns)
-
-        # calculate the starting values for the new dataframe
-        # if the starting value is not given, assume that the initial value
-        # is the smallest for all possible values
-        ini_val_pos = []  # locations of the initial good values
-        sec_val_pos = []  # locations of the second good values
-        final_df_inis = []  # location of initial value in new dataframe
-        for col in final_df.columns:
-            # find the appearance of the first value
-            # initialize the position for data that contain no good values
-            # should be the index right before the start time of the new
-            # dataframe
-            pos = datadf.index[-1]
-            sec_pos = datadf.index[-1]
-            num_gd_value = 0  # number of good values indexed
-            # find the good value appear after the required datadf first,
-            # good values include ones that are duplicated
-            # then find the one appearing right before it
-            for ind_oldind, oldind in enumerate(datadf.index[:-1]):
-                if not isinstance(datadf.loc[oldind, col], str) and \
-                        not isinstance(datadf.loc[oldind, col], Series) and \
-                        not isnan(datadf.loc[oldind, col]) and \
-                        datadf.index[ind_oldind+1] > final_df.index[0]:
-                    sec_pos = oldind
-                    sec_val_pos.append(ind_oldind)
-                    num_gd_value = 1
-                    break
-            # if you can't find the first valid point, the search for the first
-            # valid value ends
-            if num_gd_value == 1:
-                for ind_oldind, oldind in enumerate(reversed(
-                        datadf.index[:sec_val_pos[-1]]
-                        )):
-                    if not isinstance(datadf.loc[oldind, col], str) and \
-                            not isinstance(datadf.loc[oldind, col], Series) and \
-                            not isnan(datadf.loc[oldind, col]):
-                        pos = oldind
-                        ini_val_pos.append(sec_val_pos[-1]-1-ind_oldind)
-                        num_gd_value = 2
-                        break
-            # if you cannot find good values sandwiching the starting time
-            # of the new dataframe, shift the values
-            if num_gd_value == 1:
-                pos = sec_pos
-                ini_val_pos.append(sec_val_pos.pop())
-                sec_pos = datadf.index[-1]  # reset second position
-                for ind_oldind, oldind in enumerate(
-                        datadf.index[ini_val_pos[-1]+1:-1]
-                        ):
-                    if not isinstance(datadf.loc[oldind, col], Series) and \
-                            not isinstance(datadf.loc[oldind, col], str) and \
-                            not isnan(datadf.loc[oldind, col]):
-                        sec_pos = oldind
-                        sec_val_pos.append(ind_oldind+ini_val_pos[-1]+1)
-                        num_gd_value = 2
-                        break
-            # fill in placeholders if not collected
-            if num_gd_value == 0:
-                ini_val_pos.append(datadf.shape[0]-1)
-                sec_val_pos.append(datadf.shape[0]-1)
-            if num_gd_value == 1:
-                sec_val_pos.append(datadf.shape[0]-1)
-            # assign first value
-            final_df_ini = 0
-            # shift the final_df initial index if nan values are needed
-            if ini_val == 3:
-                while final_df_ini < final_df.shape[0]-2 and \
-                        final_df.index[final_df_ini] < pos:
-                    final_df.loc[final_df.index[final_df_ini], col] = \
-                        float('nan')
-                    final_df_ini += 1
-            if pos > final_df.index[-1] or num_gd_value == 0:
-                # if the first good value appears after the ending time
-                # or there are no good values in the trend
-                final_df.loc[:, col] = float('nan')
-            elif final_df.index[final_df_ini] >= pos or ini_val == 2:
-                # if the first value in the new frame may be the same as that
-                # of the old one
-                if final_df.index[final_df_ini] == pos or step or (
-                        ini_val == 2 and final_df.index[final_df_ini] < pos
-                        ):
-                    # when the first value in the column equals to the first
-                    # available value
-                    final_df.loc[final_df.index[final_df_ini], col] = \
-                        datadf.loc[pos, col]
-                    # use the second value instead if the sec_pos also appears
-                    # earlier than the first entry of the new data frame
-                    if step and sec_pos <= final_df.index[final_df_ini]:
-                        final_df.loc[final_df.index[final_df_ini], col] = \
-                            datadf.loc[sec_pos, col]
-                else:  # need interpolation
-                    final_df.loc[final_df.index[final_df_ini], col] = \
-                        interpolate_with_s(
-                            final_df.index[final_df_ini], pos, sec_pos,
-                            datadf.loc[pos, col], datadf.loc[sec_pos, col]
-                        )
+
+def write_xlsx_constant_memory(final_dfs: dict, output_file: str,
+                               float_format: str=None, callback=None):
+    """
+        Write a dict of pandas DataFrame to an xlsx file row by row with
+        the constant memory mode of xlsxwriter. A worksheet with more rows
+        than an Excel worksheet can hold is continued in worksheets named
+        with ' (2)', ' (3)', etc. after the name of the worksheet
+
+        Inputs:
+        ==========
+        final_dfs: dict of pandas DataFrame
+            dataframes to be written with key values being the names of the
+            worksheets
+
+        output_file: str
+            path to the xlsx file
+
+        float_format: str
+            format string of the float values. Default None
+
+        callback: function
+            function called after each worksheet is written like in
+            convert_df(). Default None
+    """
+
+    workbook = Workbook(output_file, {'constant_memory': True})
+    header_format = workbook.add_format({
+        'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'
+    })
+    date_format = workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm:ss'})
+    max_rows = XLSX_MAX_ROWS-1  # the first row is the header
+    for ind, name in enumerate(final_dfs):
+        final_df = final_dfs[name]
+        sheet_name = name
+        if len(sheet_name) >= 30:  # limit to excel worksheet name
+            sheet_name = ''.join([
+                sheet_name[0:27], '(', '%02i' % (ind+1), ')'
+            ])
+        for part in range(max(1, -(-len(final_df)//max_rows))):
+            if part == 0:
+                worksheet = workbook.add_worksheet(sheet_name)
             else:
-                # the minimum value assumption should be used
-                # use to_numeric to push all non-numeric data to NaN values
-                try:
-                    final_df.loc[final_df.index[0], col] = to_numeric(
-                        datadf[col][start_time:end_time+timedelta(0, 0, 1)],
-                        errors='coerce'
-                    ).dropna().unique().min()  # include the one at end_time
-                except ValueError:  # no valid values
-                    final_df.loc[:, col] = float('nan')
-            final_df_ini += 1
-            final_df_inis.append(final_df_ini)
-
-        if step:  # assume step function
-            # continue to append new columns until the end
-            for col, ini, new_ini, sec_ini in zip(
-                    final_df.columns, ini_val_pos, final_df_inis, sec_val_pos
-                    ):
-                # if the whole column is nan value, skip the col
-                if all([
-                        isinstance(ent, str) or isinstance(ent, Series) or
-                        isnan(ent)
-                        for ent in datadf.loc[
-                            start_time:end_time+timedelta(0, 0, 1), col
-                        ]  # include the one at end_time
-                        ]):
-                    continue # skip column
-                oldind = ini
-                newind = new_ini
-                oldlen = datadf.shape[0]
-                newlen = final_df.shape[0]
-                # ensure that the first index for datadf is earlier or
-                # happen at the same time as that of final_df's first data
-                # while the second index for datadf must appear later than
-                # the first one
-                if final_df.index[newind] > datadf.index[oldind] and \
-                        final_df.index[newind] >= datadf.index[sec_ini]:
-                    oldind = sec_ini  # shift it
-                while newind < newlen:
-                    if final_df.index[newind] < datadf.index[oldind]:
-                        # use the previous value
-                        final_df.loc[final_df.index[newind], col] = \
-                            final_df.loc[final_df.index[newind-1], col]
-                    else:
-                        # find a new value
-                        # logic:
-                        # 1st: check if the value is valid, if not, keep
-                        # moving forward in the old series until a valid value
-                        # is found, it reaches to the end of the series,
-                        # or it becomes larger than the current value
-                        # ignore all duplicated values. They are probably all
-                        # wrong
-                        while oldind < oldlen-1 and (isinstance(
-                                datadf.loc[datadf.index[oldind], col], str
-                                ) or isinstance(
-                                datadf.loc[datadf.index[oldind], col], Series
-                                ) or isnan(
-                                    datadf.loc[datadf.index[oldind], col]
-                                )) and \
-                                datadf.index[oldind] <= final_df.index[newind]:
-                            oldind += 1
-                        # if the entry at oldind is still invalid, use
-                        # the previous value in the new entry
-                        if (isinstance(
-                                datadf.loc[datadf.index[oldind], col], str
-                                ) or isinstance(
-                                datadf.loc[datadf.index[oldind], col], Series
-                                ) or isnan(
-                                    datadf.loc[datadf.index[oldind], col]
-                                )):
-                            final_df.loc[final_df.index[newind], col] = \
-                                final_df.loc[final_df.index[newind-1], col]
-                        # after getting a valid value in the old series,
-                        # check if it is actually the very last entry
-                        # of the current entry of the new series. If so
-                        # assign it to the current entry of the news series.
-                        # If not, check the validity of all values between
-                        # it and the current entry of the new series. If none
-                        # of them is valid, also 
-                        elif oldind == oldlen-1 or (
-                                oldind < oldlen-1 and
-                                final_df.index[newind] < datadf.index[oldind+1]
-                                ):
-                            final_df.loc[final_df.index[newind], col] = \
-                                datadf.loc[datadf.index[oldind], col]
-                        else:
-                            # assign the first valid value encountered between
-                            # the oldind and newind in the old series
-                            # if no assignment is done. All values in
-                            # between are invalid, set it to the oldind value
-                            final_df.loc[final_df.index[newind], col] = \
-                                datadf.loc[datadf.index[oldind], col]
-                            for sb_ts in reversed(datadf[
-                                datadf.index[oldind]:final_df.index[newind]
-                                ].index):
-                                if not (isinstance(
-                                    datadf.loc[sb_ts, col], str
-                                ) or isinstance(
-                                    datadf.loc[sb_ts, col], Series
-                                ) or isnan(
-                                    datadf.loc[sb_ts, col]
-                                )):
-                                    final_df.loc[
-                                        final_df.index[newind], col
-                                    ] = datadf.loc[sb_ts, col]
-                                    # set the oldind to the new position
-                                    while datadf.index[oldind] < sb_ts:
-                                        oldind += 1
-                                    break
-                        if oldind < oldlen-1:
-                            oldind += 1
-                    newind += 1
-        else:  # run interpolation
-            # continue to append new columns until the end
-            newlen = final_df.shape[0]
-            for col, ini, new_ini in zip(
-                    final_df.columns, ini_val_pos, final_df_inis
-                    ):
-                newind = new_ini
-                # to fit the initial value assumption
-                try:
-                    while final_df.index[newind] < datadf.index[ini]:
-                        final_df.loc[final_df.index[newind], col] = \
-                            final_df.loc[final_df.index[newind-1], col]
-                        newind += 1
-                except IndexError:  # all initial values
-                    continue  # next loop
-                oldind = ini
-                while newind < newlen:
-                    # find the next available value in the old dataframe
-                    # good values include ones that are duplicated
-                    oldoldind = oldind
-                    oldind += 1
-                    try:
-                        while isinstance(
-                                datadf.loc[datadf.index[oldind], col], str
-                                ) or isinstance(
-                                datadf.loc[datadf.index[oldind], col], Series
-                                ) or isnan(
-                                    datadf.loc[datadf.index[oldind], col]
-                                ):
-                            oldind += 1
-                    except IndexError:  # out of frame. Use the old value
-                        oldind = oldoldind
-                    # for both interpolation and extrapolation at the end
-                    while newind < newlen and (
-                            oldind == oldoldind or
-                            final_df.index[newind] <= datadf.index[oldind]
-                            ):
-                        if oldind == oldoldind:  # extrapolation at the end
-                            final_df.loc[final_df.index[newind], col] = \
-                                interpolate_with_s(
-                                    final_df.index[newind],
-                                    datadf.index[oldind-1],
-                                    datadf.index[oldind],
-                                    datadf.loc[datadf.index[oldind-1], col],
-                                    datadf.loc[datadf.index[oldind], col]
-                                )
-                        else:
-                            # interpolation
-                            final_df.loc[final_df.index[newind], col] = \
-                                interpolate_with_s(
-                                    final_df.index[newind],
-                                    final_df.index[newind-1],
-                                    datadf.index[oldind],
-                                    final_df.loc[final_df.index[newind-1], col],
-                                    datadf.loc[datadf.index[oldind], col]
-                                )
-                        newind += 1
-
-        # change time format as needed
-        if outputtimevalue != 'None':
-            coltime = ''.join(['TimeValue from ', str(final_df.index[0])])
-            final_df.loc[:, coltime] = (
-                final_df.index-final_df.index[0]
-            ).total_seconds()
-            if outputtimevalue == 'minutes':
-                final_df.loc[:, coltime] = \
-                    final_df.loc[:, coltime]/60.0
-            elif outputtimevalue == 'hours':
-                final_df.loc[:, coltime] = \
-                    final_df.loc[:, coltime]/3600.0
-            elif outputtimevalue == 'days':
-                final_df.loc[:, coltime] = \
-                    final_df.loc[:, coltime]/3600.0/24.0
-            final_df.set_index(coltime, inplace=True)
-
-        final_dfs[sheet_name] = final_df
+                suffix = ''.join([' (', str(part+1), ')'])
+                worksheet = workbook.add_worksheet(''.join([
+                    sheet_name[0:31-len(suffix)], suffix
+                ]))
+            block = final_df.iloc[part*max_rows:(part+1)*max_rows]
 
-    # output new file
-    if output_file is not None:
-        mkdir_if_not_exist(dirname(output_file))
-        if output_file.split('.')[-1] == 'csv':
-            final_dfs[[ent for ent in final_dfs.keys()][0]].to_csv(
-                output_file, sep=sep, date_format=output_timestring
-            )
-        elif output_file.split('.')[-1] == 'xlsx':
-            # need to open and close files if engine is not 'xlsxWriter'
-            with ExcelWriter(
-                    output_file, engine='xlsxwriter'
-                    ) as writer:
-                for ind, sheet_name in enumerate(final_dfs):
-                    if len(sheet_name) < 30:
-                        final_dfs[sheet_name].to_excel(writer, sheet_name)
-                    else:  # limit to excel worksheet name
-                        final_dfs[sheet_name].to_excel(writer, ''.join([
-                            sheet_name[0:27], '(', '%02i' % (ind+1), ')'
-                        ]))
-                writer.save()
-        elif output_file.split('.')[-1] == 'xls':
-            with ExcelWriter(
-                    output_file, engine='xlwt'
-                    ) as writer:
-                for sheet_name in final_dfs:
-                    if len(sheet_name) < 30:
-                        final_dfs[sheet_name].to_excel(writer, sheet_name)
-                    else:  # limit to excel worksheet name
-                        final_dfs[sheet_name].to_excel(writer, ''.join([
-                            sheet_name[0:27], '(', '%02i' % (ind+1), ')'
-                        ]))
-                writer.save()
-        else:
-            raise ValueError('Wrong extension for output file')
+            # write the header
+            if final_df.index.name is not None:
+                worksheet.write(0, 0, final_df.index.name, header_format)
+            for colind, col in enumerate(final_df.columns):
+                worksheet.write(0, colind+1, str(col), header_format)
 
-    return final_dfs
+            # write the rows in order and convert only one row at a time to
+            # python objects so that the memory does not depend on the
+            # number of rows
+            is_time = isinstance(block.index, DatetimeIndex)
+            times = block.index.values
+            values = block.values
+            for rowind in range(len(block)):
+                if is_time:
+                    worksheet.write_datetime(
+                        rowind+1, 0, Timestamp(times[rowind]).to_pydatetime(),
+                        date_format
+                    )
+                else:
+                    worksheet.write_number(rowind+1, 0, times[rowind].item())
+                for colind, value in enumerate(values[rowind].tolist()):
+                    if not isnan(value):  # leave NaN values blank
+                        if float_format is not None:
+                            value = float(float_format % value)
+                        worksheet.write_number(rowind+1, colind+1, value)
+        _report_written(callback, name, ind+1, len(final_dfs), len(final_df))
+    workbook.close()
+
+
+def _set_time_values(final_df: DataFrame, start_time: datetime,
+                     outputtimevalue: str):
+    """
+        Replace the index of final_df in place by the time values from
+        start_time
+
+        Inputs:
+        ==========
+        final_df: pandas DataFrame
+            dataframe with time stamps as the index
+
+        start_time: datetime.datetime
+            the time where the time values begin
+
+        outputtimevalue: str
+            unit of the time values. Can be 'seconds', 'minutes', 'hours'
+            and 'days'
+    """
+
+    coltime = ''.join(['TimeValue from ', str(start_time)])
+    final_df.loc[:, coltime] = (final_df.index-start_time).total_seconds()
+    if outputtimevalue == 'minutes':
+        final_df.loc[:, coltime] = \
+            final_df.loc[:, coltime]/60.0
+    elif outputtimevalue == 'hours':
+        final_df.loc[:, coltime] = \
+            final_df.loc[:, coltime]/3600.0
+    elif outputtimevalue == 'days':
+        final_df.loc[:, coltime] = \
+            final_df.loc[:, coltime]/3600.0/24.0
+    final_df.set_index(coltime, inplace=True)
 
 
 def mkdir_if_not_exist(usrpath: str):
@@ -472,14 +1891,260 @@ def interpolate_with_s(mid_date: datetime, a_date: datetime, b_date: datetime,
         return float('nan')
     return result
 
+
+def resample_as_step(times: ndarray, values: ndarray, new_times: ndarray,
+                     ini_val: int=1) -> ndarray:
+    """
+        Resample valid values collected at time of change to new time stamps
+        by assuming the values to be step functions, i.e. each new time stamp
+        takes the last valid value at or before it. Returns a numpy array of
+        float64 values with the same length as new_times
+
+        Inputs:
+        ==========
+        times: numpy.ndarray
+            sorted time stamps of the valid values in int64 nanoseconds
+
+        values: numpy.ndarray
+            valid float64 values at the time stamps in times
+
+        new_times: numpy.ndarray
+            sorted new time stamps in int64 nanoseconds
+
+        ini_val: int
+            the assumption to the initial value if the new time stamps begin
+            before the occurrence of the first valid value.
+                1: Use the minimum value in the trend
+                2: Use the first value in the trend
+                3: Fill in float('nan') (blank) values
+            Default 1
+    """
+
+    result = full(len(new_times), nan)
+    if len(times) == 0 or times[0] > new_times[-1]:
+        # no good values before the ending time
+        return result
+
+    # position of the last valid value at or before each new time stamp
+    pos = times.searchsorted(new_times, side='right')-1
+    found = pos >= 0
+    result[found] = values[pos[found]]
+
+    _fill_initial_values(result, found, times, values, new_times, ini_val)
+
+    return result
+
+
+def resample_by_interpolation(times: ndarray, values: ndarray,
+                              new_times: ndarray, ini_val: int=1) -> ndarray:
+    """
+        Resample valid values collected at time of change to new time stamps
+        by linear interpolation between the valid values sandwiching each
+        new time stamp. New time stamps after the last valid value are
+        extrapolated with the last two valid values. Returns a numpy array of
+        float64 values with the same length as new_times
+
+        Inputs:
+        ==========
+        times: numpy.ndarray
+            sorted time stamps of the valid values in int64 nanoseconds
+
+        values: numpy.ndarray
+            valid float64 values at the time stamps in times
+
+        new_times: numpy.ndarray
+            sorted new time stamps in int64 nanoseconds
+
+        ini_val: int
+            the assumption to the initial value if the new time stamps begin
+            before the occurrence of the first valid value.
+                1: Use the minimum value in the trend
+                2: Use the first value in the trend
+                3: Fill in float('nan') (blank) values
+            Default 1
+    """
+
+    result = full(len(new_times), nan)
+    if len(times) == 0 or times[0] > new_times[-1]:
+        # no good values before the ending time
+        return result
+
+    # position of the last valid value at or before each new time stamp
+    pos = times.searchsorted(new_times, side='right')-1
+    found = pos >= 0
+    if len(times) > 1:
+        # interpolate with the values sandwiching the new time stamps, or
+        # extrapolate with the last two values after the last one
+        apos = minimum(pos[found], len(times)-2)
+        bpos = apos+1
+        result[found] = (values[bpos]-values[apos]) * \
+            ((new_times[found]-times[apos])/1e9) / \
+            ((times[bpos]-times[apos])/1e9)+values[apos]
+    # use the valid values as they are at the same time stamps
+    same = found & (new_times == times[pos])
+    result[same] = values[pos[same]]
+
+    _fill_initial_values(result, found, times, values, new_times, ini_val)
+
+    return result
+
+
+def _fill_initial_values(result: ndarray, found: ndarray, times: ndarray,
+                         values: ndarray, new_times: ndarray, ini_val: int):
+    """
+        Fill in the entries in result which time stamps appear before the
+        first valid value according to the initial value assumption
+
+        Inputs:
+        ==========
+        result: numpy.ndarray
+            resampled float64 values to be filled in place
+
+        found: numpy.ndarray
+            boolean array which is False for new time stamps appearing before
+            the first valid value
+
+        times: numpy.ndarray
+            sorted time stamps of the valid values in int64 nanoseconds
+
+        values: numpy.ndarray
+            valid float64 values at the time stamps in times
+
+        new_times: numpy.ndarray
+            sorted new time stamps in int64 nanoseconds
+
+        ini_val: int
+            the assumption to the initial value. 1 for the minimum value in
+            the trend, 2 for the first value and 3 for float('nan')
+    """
+
+    if found.all():
+        return
+    if ini_val == 1:
+        # minimum value until the ending time
+        result[~found] = values[
+            :times.searchsorted(new_times[-1], side='right')
+        ].min()
+    elif ini_val == 2:
+        result[~found] = values[0]
+
+
+def find_valid_values(datadf: DataFrame) -> ValidValues:
+    """
+        Check the validity of every entry in datadf once and return the
+        results as a ValidValues namedtuple to be shared by all steps of the
+        conversion. Strings, NaN values and entries at duplicated time stamps
+        are all invalid.
+
+        Inputs:
+        ==========
+        datadf: pandas DataFrame
+            dataframe sorted by its index of datetime.datetime objects
+    """
+
+    unique = ~datadf.index.duplicated(keep=False)
+    values = []
+    masks = []
+    positions = []
+    for ind in range(datadf.shape[1]):
+        # use to_numeric to push all non-numeric data to NaN values
+        colvalues = to_numeric(
+            datadf.iloc[:, ind], errors='coerce'
+        ).values.astype('float64')
+        mask = unique & notnull(colvalues)
+        values.append(colvalues)
+        masks.append(mask)
+        positions.append(flatnonzero(mask))
+
+    return ValidValues(_to_ns(datadf.index), values, masks, positions)
+
+
+def new_time_stamps(start_time: datetime, end_time: datetime,
+                    interval: float) -> ndarray:
+    """
+        Return the time stamps of the new dataframe in int64 nanoseconds.
+        They begin at start_time and are separated by interval until the
+        first one at or after end_time. At least two time stamps are
+        returned.
+
+        Inputs:
+        ==========
+        start_time: datetime.datetime
+            first time stamp of the new dataframe
+
+        end_time: datetime.datetime
+            the time that the last time stamp should reach
+
+        interval: float
+            time interval between the time stamps in seconds
+    """
+
+    interval_ns = _interval_ns(interval)
+    start_ns = Timestamp(start_time).value
+    num = _num_intervals(start_ns, Timestamp(end_time).value, interval_ns)
+    return start_ns+arange(num+1, dtype='int64')*interval_ns
+
+
+def _interval_ns(interval: float) -> int:
+    """
+        Return the time interval in seconds as int nanoseconds rounded to
+        microseconds like datetime.timedelta
+
+        Inputs:
+        ==========
+        interval: float
+            time interval in seconds
+    """
+
+    return int(round(interval*1e6))*1000
+
+
+def _num_intervals(start_ns: int, end_ns: int, interval_ns: int) -> int:
+    """
+        Return the number of intervals needed to reach end_ns from start_ns,
+        rounded up. At least one interval is returned.
+
+        Inputs:
+        ==========
+        start_ns: int
+            starting time in nanoseconds
+
+        end_ns: int
+            the time that should be reached in nanoseconds
+
+        interval_ns: int
+            time interval in nanoseconds
+    """
+
+    return max(1, -((start_ns-end_ns)//interval_ns))
+
+
+def _to_ns(timeindex) -> ndarray:
+    """
+        Return a datetime index as a numpy array of int64 nanoseconds
+
+        Inputs:
+        ==========
+        timeindex: pandas DatetimeIndex
+            index of time stamps
+    """
+
+    return asarray(timeindex, dtype='datetime64[ns]').view('int64')
+
+
 # testing functions
 if __name__ == '__main__':
 
     from os.path import basename
-    from os import remove
+    from os import rmdir
+    from tempfile import mkdtemp
+    from tracemalloc import get_traced_memory, start, stop
     from data_read import read_data
+    from numpy.random import rand
+    from pandas import date_range
 
-    from pandas import read_csv, read_excel, Timestamp, ExcelFile
+    from pandas import read_csv, read_excel, read_feather, read_parquet, \
+        Timestamp, ExcelFile
 
     # check to estimate step function correctly when the required time
     # interval is larger than the time interval between the data points
@@ -501,6 +2166,18 @@ if __name__ == '__main__':
         NEW_DFS['time_of_change'].index[-1], 'Item 3'
     ] == 0
 
+    # check that the step function takes the last valid value at or before
+    # each new time stamp
+    NEW_DFS = convert_df(
+        TEST_DFS, datetime(2017, 1, 1, 8, 0), interval=60*7, ini_val=3
+    )
+    for col in ['Item 3', 'Item 4']:
+        VALID_SERIES = TEST_DFS['time_of_change'][col].dropna()
+        for newtime in NEW_DFS['time_of_change'].index:
+            if newtime >= VALID_SERIES.index[0]:
+                assert NEW_DFS['time_of_change'].loc[newtime, col] == \
+                    VALID_SERIES[:newtime].iloc[-1]
+
     # check for assuming nan values for data before the first valid value
     FILENAME = '../dat/time_of_change.csv'
     TEST_DFS = read_data(FILENAME, header=0)
@@ -742,6 +2419,26 @@ if __name__ == '__main__':
     assert Path('./testresult.xlsx').exists()
     remove('./testresult.xlsx')
 
+    # check the conversion of chunks against that of the whole data
+    for step, ini_val in [(True, 1), (True, 2), (False, 1), (False, 3)]:
+        convert_df(
+            read_data(FILENAME, header=0), datetime(2017, 1, 1, 0, 0),
+            interval=60*7, step=step, ini_val=ini_val,
+            output_file='./testresult.csv'
+        )
+        NUM_ROWS = convert_chunks(
+            read_data(FILENAME, header=0, chunksize=20)['time_of_change'],
+            './testresult-chunks.csv', datetime(2017, 1, 1, 0, 0),
+            interval=60*7, step=step, ini_val=ini_val, chunksize=100
+        )
+        with open('./testresult.csv') as csvfile:
+            WHOLE_TEXT = csvfile.read()
+        with open('./testresult-chunks.csv') as csvfile:
+            assert csvfile.read() == WHOLE_TEXT
+        assert len(WHOLE_TEXT.splitlines()) == NUM_ROWS+1
+        remove('./testresult.csv')
+        remove('./testresult-chunks.csv')
+
     # check time string
     for filename in [
         './testresult.csv', './testresult.xlsx', './testresult.xls'
@@ -779,6 +2476,45 @@ if __name__ == '__main__':
         TEST_DFS['Sheet1'].loc[datetime(2017, 1, 1, 12, 10), 'Pressure']
     )/2.0
 
+    # check the validity of the entries with strings in the data
+    VALID = find_valid_values(TEST_DFS['Sheet1'])
+    assert not VALID.masks[0][6]  # '???? 8.9' in Pressure
+    assert VALID.masks[0][7]
+    assert len(VALID.positions[2]) == 0  # 'Data Loss' in Price only
+
+    # test the interpolation between valid values that are not at the new
+    # time stamps and the extrapolation after the last valid value
+    NEW_DFS = convert_df(
+        TEST_DFS, datetime(2017, 1, 1, 11, 5), datetime(2017, 1, 1, 22, 0),
+        step=False
+    )
+    NEW_DF = NEW_DFS['Sheet1']
+    OLD_DF = TEST_DFS['Sheet1']
+    for newtime, atime, btime in [
+            (datetime(2017, 1, 1, 11, 35), datetime(2017, 1, 1, 11, 30),
+             datetime(2017, 1, 1, 11, 40)),
+            (datetime(2017, 1, 1, 21, 55), datetime(2017, 1, 1, 21, 40),
+             datetime(2017, 1, 1, 21, 50))
+            ]:
+        assert abs(NEW_DF.loc[newtime, 'Pressure']-interpolate_with_s(
+            newtime, atime, btime, OLD_DF.loc[atime, 'Pressure'],
+            OLD_DF.loc[btime, 'Pressure']
+        )) < 1e-9
+
+    # check the float32 values in the new dataframes and the output file
+    NEW_DFS = convert_df(
+        TEST_DFS, datetime(2017, 1, 1, 11, 0), datetime(2017, 1, 1, 22, 00),
+        ini_val=2, step=False, output_file='./testresult.csv',
+        dtype='float32'
+    )
+    NEW_DF = NEW_DFS['Sheet1']
+    assert NEW_DF['Pressure'].dtype == 'float32'
+    CSV_DF = read_csv('./testresult.csv', sep=';', index_col=0)
+    assert abs(
+        CSV_DF['Pressure'].values-NEW_DF['Pressure'].values
+    ).max() < 1e-5
+    remove('./testresult.csv')
+
     # test the covert_df function for minimum initial values when string
     # characters are involved
     NEW_DFS = convert_df(
@@ -796,4 +2532,245 @@ if __name__ == '__main__':
         ini_val=1, step=True
     )
 
+    # check that the worksheets converted in worker processes are the same
+    # as those converted one by one and are in the same order
+    TEST_DFS = read_data('../dat/missing_data.xlsx', header=0)
+    TEST_DFS['time_of_change'] = read_data(
+        '../dat/time_of_change.csv', header=0
+    )['time_of_change']
+    NEW_DFS = convert_df(TEST_DFS, interval=60*5, ini_val=2, step=False)
+    PARALLEL_DFS = convert_df(
+        TEST_DFS, interval=60*5, ini_val=2, step=False, workers=2
+    )
+    assert list(PARALLEL_DFS.keys()) == list(NEW_DFS.keys())
+    for sheet_name in NEW_DFS:
+        assert PARALLEL_DFS[sheet_name].equals(NEW_DFS[sheet_name])
+
+    # check that the columns resampled in worker processes are the same as
+    # those resampled one by one
+    for step in [True, False]:
+        NEW_DFS = convert_df(TEST_DFS, interval=60*5, ini_val=1, step=step)
+        PARALLEL_DFS = convert_df(
+            TEST_DFS, interval=60*5, ini_val=1, step=step, column_workers=3
+        )
+        for sheet_name in NEW_DFS:
+            assert PARALLEL_DFS[sheet_name].equals(NEW_DFS[sheet_name])
+
+    # check the xlsx file written row by row and the continuation of the
+    # worksheets with more rows than the limit
+    XLSX_MAX_ROWS = 101
+    NEW_DFS = convert_df(
+        TEST_DFS, interval=60, ini_val=2, output_file='./testresult.xlsx',
+        constant_memory=True
+    )
+    XLSX_MAX_ROWS = 1048576
+    XLSX_DFS = read_data('./testresult.xlsx', header=0, sheetnames=[])
+    for sheet_name in NEW_DFS:
+        XLSX_DF = concat([
+            XLSX_DFS[name] for name in XLSX_DFS
+            if name.split(' (')[0] == sheet_name
+        ])
+        assert len(XLSX_DF) == len(NEW_DFS[sheet_name]) > 100
+        assert (XLSX_DF.index == NEW_DFS[sheet_name].index).all()
+        # xlsxwriter writes 16 significant digits
+        assert (
+            (abs(XLSX_DF.values-NEW_DFS[sheet_name].values) < 1e-9) |
+            (XLSX_DF.isnull().values & NEW_DFS[sheet_name].isnull().values)
+        ).all()
+    remove('./testresult.xlsx')
+
+    # check that the memory used to write an xlsx file row by row does not
+    # grow with the number of rows, including the rounding of float32
+    PEAKS = []
+    for num_rows in [100, 5000]:
+        MEM_DF = DataFrame(rand(num_rows, 20).astype('float32'), index=(
+            date_range('2017-01-01', periods=num_rows, freq='min')
+        ))
+        start()
+        write_xlsx_constant_memory(
+            {'Sheet1': MEM_DF}, './testresult.xlsx', '%.7g'
+        )
+        PEAKS.append(get_traced_memory()[1])
+        stop()
+    assert PEAKS[1]-PEAKS[0] < MEM_DF.values.nbytes/4
+    XLSX_DF = read_excel('./testresult.xlsx', index_col=0)
+    assert (abs(XLSX_DF.values-MEM_DF.values) < 1e-6).all()
+    remove('./testresult.xlsx')
+
+    # check the csv files of all worksheets in a directory
+    NEW_DFS = convert_df(
+        TEST_DFS, interval=60*5, ini_val=2, output_file='./testresult.csv',
+        csv_dir=True
+    )
+    for sheet_name in NEW_DFS:
+        CSV_DF = read_csv(
+            ''.join(['./testresult/', sheet_name, '.csv']), sep=';',
+            index_col=0
+        )
+        assert len(CSV_DF) == len(NEW_DFS[sheet_name])
+        remove(''.join(['./testresult/', sheet_name, '.csv']))
+    rmdir('./testresult')
+    # worksheets with the same file name are written to different files
+    NEW_DF = NEW_DFS[list(NEW_DFS.keys())[0]]
+    write_csv_dir({
+        'a<b': NEW_DF.iloc[:1], 'a>b': NEW_DF.iloc[:2], 'A?b': NEW_DF.iloc[:3]
+    }, './testresult')
+    assert sorted(listdir('./testresult')) == \
+        sorted(['a_b.csv', 'a_b_2.csv', 'A_b_3.csv'])
+    for ind, filename in enumerate(['a_b.csv', 'a_b_2.csv', 'A_b_3.csv']):
+        CSV_DF = read_csv(join('./testresult', filename), sep=';', index_col=0)
+        assert len(CSV_DF) == ind+1
+        remove(join('./testresult', filename))
+    rmdir('./testresult')
+
+    # check the parquet and feather files with compression
+    NEW_DFS = convert_df(
+        TEST_DFS, interval=60*5, ini_val=2,
+        output_file='./testresult.parquet',
+        compression={'Item 1': 'zstd', 'Item 2': 'snappy'}
+    )
+    assert len(listdir('./testresult')) == 2
+    PARQUET_DF = read_parquet('./testresult/time_of_change.parquet')
+    assert PARQUET_DF.equals(NEW_DFS['time_of_change'])
+    NEW_DFS = convert_df(
+        {'Sheet1': TEST_DFS['Sheet1']}, interval=60*5, ini_val=2,
+        output_file='./testresult.feather', compression='zstd'
+    )
+    FEATHER_DF = read_feather('./testresult.feather').set_index('Time')
+    assert (FEATHER_DF.values == NEW_DFS['Sheet1'].values).all()
+    for filename in listdir('./testresult'):
+        remove(join('./testresult', filename))
+    rmdir('./testresult')
+    remove('./testresult.feather')
+
+    # check the new dataframes kept in memory and on disk for later calls
+    CACHE_DIR = mkdtemp()
+    NEW_DFS = convert_df(TEST_DFS, interval=60*5, ini_val=2)
+    for ind in range(2):  # keep and then reuse the dataframes
+        CACHE_DFS = convert_df(
+            TEST_DFS, interval=60*5, ini_val=2, cache_memory=10**6,
+            cache_dir=CACHE_DIR
+        )
+        for sheet_name in NEW_DFS:
+            assert CACHE_DFS[sheet_name].equals(NEW_DFS[sheet_name])
+    assert len(_RESULT_CACHE) == len(listdir(CACHE_DIR)) == 2
+    # the dataframes on disk are used after those in memory are removed
+    _RESULT_CACHE.clear()
+    CACHE_DFS = convert_df(
+        TEST_DFS, interval=60*5, ini_val=2, cache_dir=CACHE_DIR
+    )
+    for sheet_name in NEW_DFS:
+        assert CACHE_DFS[sheet_name].equals(NEW_DFS[sheet_name])
+    # other inputs give new dataframes within the size on disk
+    CACHE_DFS = convert_df(
+        TEST_DFS, interval=60*5, ini_val=3, cache_dir=CACHE_DIR,
+        cache_size=1
+    )
+    assert len(listdir(CACHE_DIR)) == 1
+    for filename in listdir(CACHE_DIR):
+        remove(join(CACHE_DIR, filename))
+    rmdir(CACHE_DIR)
+
+    # check that the output file appended with the new data is the same as
+    # the one converted from all data
+    TEST_DF = read_data('../dat/time_of_change.csv', header=0)[
+        'time_of_change'
+    ]
+    for step in [True, False]:
+        for ini_val in [1, 2, 3]:
+            for num_rows in [3, 7, 12, len(TEST_DF)]:
+                convert_df(
+                    {'time_of_change': TEST_DF.iloc[:num_rows].copy()},
+                    interval=60*7, step=step, ini_val=ini_val,
+                    output_file='./testresult.csv', incremental=True
+                )
+            convert_df(
+                {'time_of_change': TEST_DF.copy()}, interval=60*7,
+                step=step, ini_val=ini_val, output_file='./testfull.csv'
+            )
+            with open('./testresult.csv') as csvfile:
+                with open('./testfull.csv') as fullfile:
+                    assert csvfile.read() == fullfile.read()
+            remove('./testresult.csv')
+            remove('./testresult.csv.state.json')
+            remove('./testfull.csv')
+
+    # check the progress reported to the callback and the cancellation by
+    # the exceptions raised in the callback
+    EVENTS = []
+    NEW_DFS = convert_df(
+        TEST_DFS, interval=60*5, output_file='./testresult.xlsx',
+        callback=EVENTS.append
+    )
+    assert [
+        (event['sheet'], event['done']) for event in EVENTS
+        if event['event'] == 'column'
+    ] == [
+        (sheet_name, ind+1) for sheet_name in TEST_DFS
+        for ind in range(TEST_DFS[sheet_name].shape[1])
+    ]
+    assert [
+        (event['sheet'], event['done'], event['total']) for event in EVENTS
+        if event['event'] == 'sheet'
+    ] == [
+        (sheet_name, ind+1, len(TEST_DFS))
+        for ind, sheet_name in enumerate(TEST_DFS)
+    ]
+    assert [
+        (event['event'], event['phase']) for event in EVENTS
+        if event['event'] in ['phase_start', 'phase_end']
+    ] == [
+        ('phase_start', 'resample'), ('phase_end', 'resample'),
+        ('phase_start', 'write'), ('phase_end', 'write')
+    ]
+    assert all([
+        event['rows'] == len(NEW_DFS[event['sheet']]) for event in EVENTS
+        if event['event'] in ['column', 'sheet']
+    ])
+    assert sorted([event['elapsed'] for event in EVENTS]) == \
+        [event['elapsed'] for event in EVENTS]
+    remove('./testresult.xlsx')
+
+    # check the report of the time and the memory of each phase and sheet
+    EVENTS = []
+    NEW_DFS = convert_df(
+        TEST_DFS, interval=60*5, output_file='./testresult.xlsx',
+        callback=EVENTS.append, instrument=True
+    )
+    assert len([
+        event for event in EVENTS if event['event'] == 'sheet'
+    ]) == len(TEST_DFS)
+    with open('./testresult.xlsx.report.json') as jsonfile:
+        REPORT = json_load(jsonfile)
+    assert REPORT['function'] == 'convert_df'
+    assert list(REPORT['phases'].keys()) == ['resample', 'write']
+    for phase in REPORT['phases']:
+        assert list(REPORT['phases'][phase]['sheets'].keys()) == \
+            list(TEST_DFS.keys())
+        assert 0 < REPORT['phases'][phase]['wall_time'] <= \
+            REPORT['wall_time']
+        assert 0 < REPORT['phases'][phase]['peak_memory'] <= \
+            REPORT['peak_memory']
+        assert sum([
+            sheet['wall_time']
+            for sheet in REPORT['phases'][phase]['sheets'].values()
+        ]) <= REPORT['phases'][phase]['wall_time']
+    remove('./testresult.xlsx')
+    remove('./testresult.xlsx.report.json')
+
+    def _cancel_at_second_column(event):
+        """
+            Stop convert_df() at the second column for the test
+        """
+        if event['event'] == 'column' and event['done'] == 2:
+            raise KeyboardInterrupt
+    try:
+        convert_df(
+            TEST_DFS, interval=60*5, output_file='./testresult.csv',
+            callback=_cancel_at_second_column
+        )
+        raise AssertionError('convert_df() is not cancelled')
+    except KeyboardInterrupt:
+        assert not Path('./testresult.csv').exists()
+
     print('All functions in', basename(__file__), 'are ok')
@@ -16,6 +16,7 @@ from math import isnan
 from ntpath import split
 from os.path import isfile, dirname
 from pathlib import Path
+from threading import Event, Thread
 from traceback import format_exc
 from webbrowser import open as webbrowseropen
 
@@ -25,8 +26,8 @@ import wx
 from wx import adv
 
 # import user-defined modules
-from data_read import read_data
-from format_data import convert_df
+from data_read import read_data, PARSE_CACHE_DIR
+from format_data import convert_df, RESULT_CACHE_MEMORY
 
 
 # define global variables
@@ -57,6 +58,21 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 For licenses of modules involved in the development of the software,
 please visit <https://github.com/howardcheung/data-preprocessing-helper/>
 """
+GAUGE_RANGE = 1000  # range of the progress bar
+# fractions of the progress bar for resampling the columns and for writing
+# the worksheets. The progress bar pulses while the data file is read
+RESAMPLE_FRACTION = 0.8
+WRITE_FRACTION = 0.2
+
+
+# define exceptions
+class ProcessingCancelled(Exception):
+    """
+        Exception raised in the worker thread to stop the processing when
+        the Cancel button is pressed
+    """
+    pass
+
 
 # classes for tabs
 # Template from https://wiki.wxpython.org/Simple%20wx.Notebook%20Example
@@ -536,18 +552,30 @@ class MainFrame(wx.Frame):
         nb.AddPage(page1, "Basic settings")
         nb.AddPage(page2, "Advanced settings")
 
-        # create button
-        button_ok = wx.Button(p, label=u'Preprocess', size=(100, 30))
-        button_ok.Bind(wx.EVT_BUTTON, self.Analyzer)
+        # create the progress bar and the buttons
+        self.gauge = wx.Gauge(p, range=GAUGE_RANGE, size=(450, 20))
+        self.button_cancel = wx.Button(p, label=u'Cancel', size=(100, 30))
+        self.button_cancel.Bind(wx.EVT_BUTTON, self.OnCancel)
+        self.button_cancel.Disable()
+        self.button_ok = wx.Button(p, label=u'Preprocess', size=(100, 30))
+        self.button_ok.Bind(wx.EVT_BUTTON, self.Analyzer)
+        hbox = wx.BoxSizer(wx.HORIZONTAL)
+        hbox.Add(self.gauge, 1, wx.ALIGN_CENTER_VERTICAL | wx.LEFT | wx.RIGHT, border=5)
+        hbox.Add(self.button_cancel, 0, wx.RIGHT, border=5)
+        hbox.Add(self.button_ok, 0, wx.RIGHT, border=5)
 
         # finally, put the notebook in a sizer for the panel to manage
         # the layout
         sizer = wx.BoxSizer(wx.VERTICAL)
         sizer.Add(nb, 15, 0, border=10)  # 25 for space under the advanced tab
-        sizer.Add(button_ok, 1, wx.ALIGN_RIGHT | wx.RIGHT | wx.TOP | wx.BOTTOM, border=5)
+        sizer.Add(hbox, 1, wx.EXPAND | wx.TOP | wx.BOTTOM, border=5)
         sizer.SetSizeHints(self)
         self.SetSizerAndFit(sizer)
 
+        # show the progress of the processing in the status bar
+        self.CreateStatusBar()
+        self.cancel_event = Event()
+
         self.Centre()
 
     # define all event functions here
@@ -814,36 +842,71 @@ class MainFrame(wx.Frame):
             )
             return
 
-        # Run the analyzer
+        # Run the analyzer in a worker thread so that the window keeps
+        # responding and the processing can be cancelled
+        header_exist = self.header.GetValue()
+        read_kwargs = {
+            'header': (self.header_no.GetValue() if header_exist else None),
+            'time_format': self.timestring.GetValue(),
+            'sheetnames': (
+                [] if self.loadallsheets.GetValue() else (
+                    None
+                    if get_ext(self.dfpath.GetValue()) == 'csv'
+                    else [self.sheetname.GetValue()]
+                )
+            ), 'dateautodetect': self.autotimeinputformat.GetValue(),
+            # avoid parsing the same file again for another output
+            'cache_dir': PARSE_CACHE_DIR
+        }
+        convert_kwargs = {
+            'start_time': (
+                None if self.use_starttime.GetValue() else start_time
+            ),
+            'end_time': (None if self.no_endtime.GetValue() else end_time),
+            'interval': int(self.time_int.GetValue())*60,
+            'step': (True if self.func_choice.GetSelection() == 0 else False),
+            'ini_val': self.early_pts.GetSelection()+1,
+            'output_file': self.newdfpath.GetValue(),
+            'sep': self.output_sep.GetValue(),
+            'output_timestring': self.outputtimestring.GetValue(),
+            'outputtimevalue': self.numtimeoutput.GetValue(),
+            # only write the output file for the same conversion
+            'cache_memory': RESULT_CACHE_MEMORY
+        }
+        self.cancel_event.clear()
+        self.button_ok.Disable()
+        self.button_cancel.Enable()
+        self.gauge.SetValue(0)
+        self.SetStatusText(u'Reading the data file......')
+        Thread(target=self.RunAnalysis, args=(
+            self.dfpath.GetValue(), read_kwargs, convert_kwargs
+        ), daemon=True).start()
+        evt.Skip()
+
+    def RunAnalysis(self, filename: str, read_kwargs: dict,
+                    convert_kwargs: dict):
+        """
+            Function to read and convert the data in the worker thread. The
+            window is only changed through wx.CallAfter() here
+
+            Inputs:
+            ==========
+            filename: str
+                path to the data file
+
+            read_kwargs: dict
+                inputs of read_data() except the path to the data file
+
+            convert_kwargs: dict
+                inputs of convert_df() except the dataframes and csv_dir
+        """
         # output any error to a message box if needed
         try:
-            header_exist = self.header.GetValue()
             datadfs = read_data(
-                self.dfpath.GetValue(),
-                header=(self.header_no.GetValue() if header_exist else None),
-                time_format=self.timestring.GetValue(),
-                sheetnames=(
-                    [] if self.loadallsheets.GetValue() else (
-                        None
-                        if get_ext(self.dfpath.GetValue()) == 'csv'
-                        else [self.sheetname.GetValue()]
-                    )
-                ), dateautodetect=self.autotimeinputformat.GetValue()
+                filename, callback=self.ReportProgress, **read_kwargs
             )
-            # return error if load all sheet option is selected for csv file
-            # output
-            if get_ext(self.newdfpath.GetValue()) == 'csv' and \
-                    self.loadallsheets.GetValue() and \
-                    len(datadfs) > 1:
-                wx.MessageBox(
-                    u'\n'.join([
-                        u'Cannot output multiple worksheets to a csv file!',
-                        u'Please output it as a xls or xlsx file!'
-                    ]), u'Error',
-                    wx.OK | wx.ICON_INFORMATION
-                )
-                return
             # show warning for columns that contain no valid data
+            messages = []
             for sheet_name in datadfs:
                 datadf = datadfs[sheet_name]
                 for col in datadf.columns:
@@ -851,46 +914,184 @@ class MainFrame(wx.Frame):
                         isinstance(x, str) or isnan(x)
                         for x in datadf.loc[:, col]
                     ]):
-                        dlg = MessageDlg(''.join([
-                                'Column ', col, ' in ', sheet_name, 
-                                ' does not contain any valid values.',
-                                ' Closing in 2s......'
-                            ]), u'Warning')        
-                        wx.CallLater(2000, dlg.Destroy)
-                        dlg.ShowModal()
+                        messages.append(''.join([
+                            'Column ', col, ' in ', sheet_name,
+                            ' does not contain any valid values.',
+                            ' Closing in 2s......'
+                        ]))
+                self.CheckCancelled()
+            if messages:
+                wx.CallAfter(self.ShowWarnings, messages)
+            # count the progress of all columns and worksheets
+            self.num_columns = max(1, sum([
+                datadfs[sheet_name].shape[1] for sheet_name in datadfs
+            ]))
+            self.columns_done = 0
             convert_df(
-               datadfs, (None if self.use_starttime.GetValue() else start_time),
-               (None if self.no_endtime.GetValue() else end_time),
-               interval=int(self.time_int.GetValue())*60,
-               step=(True if self.func_choice.GetSelection() == 0 else False),
-               ini_val=self.early_pts.GetSelection()+1,
-               output_file=self.newdfpath.GetValue(),
-               sep=self.output_sep.GetValue(),
-               output_timestring=self.outputtimestring.GetValue(),
-               outputtimevalue=self.numtimeoutput.GetValue()
+                datadfs, callback=self.ReportProgress,
+                # write multiple worksheets to a directory of csv files
+                csv_dir=(len(datadfs) > 1), **convert_kwargs
             )
 
             # function to be called upon finishing processing
-            wx.CallLater(0, self.ShowMessage)
-            evt.Skip()
+            wx.CallAfter(self.FinishAnalysis, u'Processing Completed')
+            wx.CallAfter(self.ShowMessage)
+
+        except ProcessingCancelled:
+            wx.CallAfter(self.FinishAnalysis, u'Processing Cancelled')
 
         except PermissionError:  # file writing error
-            dlg = MessageDlg(''.join([
-                'Unable to write to the file "', self.newdfpath.GetValue(),
-                '"\n\n',
-                'Please close the file/ stop using the file and press '
-                'the Preprocess button again.\n\n'
-            ]), u'File writing error')
-            dlg.ShowModal()
+            wx.CallAfter(self.FinishAnalysis, u'Processing Failed')
+            wx.CallAfter(self.ShowWritingError, convert_kwargs['output_file'])
 
         except BaseException:
-            # box = wx.MessageDialog(
-                # self, format_exc(), u'Error', wx.OK | wx.ICON_INFORMATION
-            # )
-            chgdep = ErrorReportingDialog(None)
-            chgdep.ShowModal()
-            chgdep.Destroy()
-            return
+            wx.CallAfter(self.FinishAnalysis, u'Processing Failed')
+            wx.CallAfter(self.ShowError, format_exc())
+
+    def ReportProgress(self, event: dict):
+        """
+            Function called by read_data() and convert_df() in the worker
+            thread to show their progress and to stop them if the Cancel
+            button is pressed
+
+            Inputs:
+            ==========
+            event: dict
+                progress reported by read_data() or convert_df()
+        """
+        self.CheckCancelled()
+        if event['event'] in ['phase_start', 'phase_end']:
+            return  # only the rows, the columns and the worksheets are shown
+        elif event['event'] == 'rows':
+            value = None  # the number of rows is unknown before reading
+            message = ''.join([
+                'Reading worksheet ', str(event['sheet']), ': ',
+                str(event['rows']), ' rows'
+            ])
+        elif event['event'] == 'column':
+            self.columns_done += 1
+            value = int(
+                GAUGE_RANGE*RESAMPLE_FRACTION*self.columns_done /
+                self.num_columns
+            )
+            # estimate the time left from the elapsed time of the columns
+            message = ''.join([
+                'Resampling column ', str(event['column']), ' in ',
+                str(event['sheet']), ' (', str(event['done']), '/',
+                str(event['total']), '), about ', str(int(
+                    event['elapsed']*(self.num_columns-self.columns_done) /
+                    self.columns_done
+                )), ' s left'
+            ])
+        else:
+            value = int(GAUGE_RANGE*(
+                RESAMPLE_FRACTION+WRITE_FRACTION*event['done']/event['total']
+            ))
+            message = ''.join([
+                'Writing worksheet ', str(event['sheet']), ' (',
+                str(event['done']), '/', str(event['total']), ')'
+            ])
+        wx.CallAfter(self.UpdateProgress, value, message)
+
+    def CheckCancelled(self):
+        """
+            Function to stop the worker thread if the Cancel button is
+            pressed
+        """
+        if self.cancel_event.is_set():
+            raise ProcessingCancelled
+
+    def UpdateProgress(self, value: int, message: str):
+        """
+            Function to show the progress in the progress bar and the
+            status bar
+
+            Inputs:
+            ==========
+            value: int
+                value of the progress bar. None to pulse the progress bar
+
+            message: str
+                message in the status bar
+        """
+        if self.cancel_event.is_set():
+            return  # keep the cancelling message
+        if value is None:
+            self.gauge.Pulse()
+        else:
+            self.gauge.SetValue(value)
+        self.SetStatusText(message)
+
+    def OnCancel(self, evt):
+        """
+            Function to stop the processing at the next column or worksheet
+        """
+        self.cancel_event.set()
+        self.button_cancel.Disable()
+        self.SetStatusText(u'Cancelling......')
+        evt.Skip()
+
+    def FinishAnalysis(self, message: str):
+        """
+            Function to reset the buttons and the progress bar after the
+            processing ends
+
+            Inputs:
+            ==========
+            message: str
+                message in the status bar
+        """
+        self.button_ok.Enable()
+        self.button_cancel.Disable()
+        self.gauge.SetValue(
+            GAUGE_RANGE if message == u'Processing Completed' else 0
+        )
+        self.SetStatusText(message)
+
+    def ShowWarnings(self, messages: list):
+        """
+            Function to show the warnings for columns that contain no valid
+            data one by one
+
+            Inputs:
+            ==========
+            messages: list
+                list of the warning messages
+        """
+        for message in messages:
+            dlg = MessageDlg(message, u'Warning')
+            wx.CallLater(2000, dlg.Destroy)
+            dlg.ShowModal()
+
+    def ShowWritingError(self, output_file: str):
+        """
+            Function to show the error of writing the output file
+
+            Inputs:
+            ==========
+            output_file: str
+                path to the output file
+        """
+        dlg = MessageDlg(''.join([
+            'Unable to write to the file "', output_file,
+            '"\n\n',
+            'Please close the file/ stop using the file and press '
+            'the Preprocess button again.\n\n'
+        ]), u'File writing error')
+        dlg.ShowModal()
+
+    def ShowError(self, message: str):
+        """
+            Function to show the error in the worker thread
+
+            Inputs:
+            ==========
+            message: str
+                traceback of the error
+        """
+        chgdep = ErrorReportingDialog(None, message=message)
+        chgdep.ShowModal()
+        chgdep.Destroy()
 
     def ShowMessage(self):
         """
@@ -929,11 +1130,13 @@ class ErrorReportingDialog(wx.Dialog):
         from http://zetcode.com/wxpython/dialogs/
     """
 
-    def __init__(self, *args, **kw):
+    def __init__(self, *args, message: str=None, **kw):
         """
-            Initializing the dialog box
+            Initializing the dialog box with the error message. Use the
+            traceback of the error being handled if message is None
         """
         super(ErrorReportingDialog, self).__init__(*args, **kw)
+        self.message = format_exc() if message is None else message
 
         self.InitUI()
         self.SetSize((500, 400))
@@ -952,7 +1155,7 @@ class ErrorReportingDialog(wx.Dialog):
         ]))
         sbs = wx.StaticBoxSizer(sb, orient=wx.VERTICAL)
         sbs.Add(wx.TextCtrl(
-            pnl, value=format_exc(), size=(475, 400),
+            pnl, value=self.message, size=(475, 400),
             style=wx.TE_READONLY | wx.TE_MULTILINE
         ))
 